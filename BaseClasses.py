@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import bisect
 import collections
 import copy
 import itertools
 import functools
+import heapq
 import logging
 import random
 import secrets
+import threading
 import typing  # this can go away when Python 3.8 support is dropped
 from argparse import Namespace
 from collections import Counter, deque
@@ -35,6 +38,14 @@ class Group(TypedDict, total=False):
     link_replacement: bool
 
 
+class SphereCache(NamedTuple):
+    """Logical spheres of all locations, starting from the starting inventory"""
+    spheres: List[Set[Location]]
+    unreachable: Set[Location]
+    beaten_sphere: Optional[int]
+    """amount of spheres that have to be collected to beat the game, None if it can't be beaten"""
+
+
 class ThreadBarrierProxy:
     """Passes through getattr while passthrough is True"""
     def __init__(self, obj: object) -> None:
@@ -60,8 +71,13 @@ class MultiWorld():
     regions: RegionManager
     itempool: List[Item]
     is_race: bool = False
+    parallel_stage_workers: int = 0
+    """amount of threads to run World stages declared in World.parallel_safe_stages with, 0 or 1 to run sequentially"""
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
+    _sphere_cache: Optional[SphereCache] = None
+    _sphere_cache_version: int = 0
+    _sphere_cache_lock: threading.Lock
 
     plando_options: PlandoOptions
     early_items: Dict[int, Dict[str, int]]
@@ -95,11 +111,25 @@ class MultiWorld():
         region_cache: Dict[int, Dict[str, Region]]
         entrance_cache: Dict[int, Dict[str, Entrance]]
         location_cache: Dict[int, Dict[str, Location]]
+        filled_location_cache: Dict[int, List[Tuple[int, Location]]]
+        """maps player to its filled locations as (position in location_cache, location), kept in that order"""
+        unfilled_location_cache: Dict[int, List[Tuple[int, Location]]]
+        """maps player to its unfilled locations as (position in location_cache, location), kept in that order"""
+        item_location_cache: Dict[int, Dict[str, List[Tuple[Tuple[int, int], Location]]]]
+        """maps item player and item name to the cached locations holding such an item as
+        ((location player, position in location_cache), location), kept in that order"""
+        location_order: Dict[int, Dict[str, int]]
+        """position of each location in location_cache, to return indexed locations in the same order"""
 
         def __init__(self, players: int):
             self.region_cache = {player: {} for player in range(1, players+1)}
             self.entrance_cache = {player: {} for player in range(1, players+1)}
             self.location_cache = {player: {} for player in range(1, players+1)}
+            self.filled_location_cache = {player: [] for player in range(1, players+1)}
+            self.unfilled_location_cache = {player: [] for player in range(1, players+1)}
+            self.item_location_cache = {}
+            self.location_order = {player: {} for player in range(1, players+1)}
+            self._location_counter = itertools.count()  # next() is atomic, as locations may be added from threads
 
         def __iadd__(self, other: Iterable[Region]):
             self.extend(other)
@@ -120,6 +150,68 @@ class MultiWorld():
             self.region_cache[new_id] = {}
             self.entrance_cache[new_id] = {}
             self.location_cache[new_id] = {}
+            self.filled_location_cache[new_id] = []
+            self.unfilled_location_cache[new_id] = []
+            self.location_order[new_id] = {}
+
+        def add_location(self, location: Location) -> None:
+            assert location.name not in self.location_cache[location.player], \
+                f"{location.name} already exists in the location cache."
+            self.location_cache[location.player][location.name] = location
+            self.location_order[location.player][location.name] = next(self._location_counter)
+            self.update_location_item(location, None)
+
+        def remove_location(self, location: Location) -> None:
+            self.update_location_item(location, location.item, removed=True)
+            del self.location_cache[location.player][location.name]
+            del self.location_order[location.player][location.name]
+
+        def update_location_item(self, location: Location, previous_item: Optional[Item], removed: bool = False):
+            """Updates the fill status and item indexes of a cached location whose item was previous_item."""
+            order = self.location_order[location.player][location.name]
+            if previous_item is None:
+                self._discard_location(self.unfilled_location_cache[location.player], order)
+            else:
+                self._discard_location(self.filled_location_cache[location.player], order)
+                self._discard_location(self.item_location_cache.get(previous_item.player, {})
+                                       .get(previous_item.name, []), (location.player, order))
+            if removed:
+                return
+            item = location.item
+            if item is None:
+                bisect.insort(self.unfilled_location_cache[location.player], (order, location))
+            else:
+                bisect.insort(self.filled_location_cache[location.player], (order, location))
+                bisect.insort(self.item_location_cache.setdefault(item.player, {}).setdefault(item.name, []),
+                              ((location.player, order), location))
+
+        def find_item_locations(self, item_names: Iterable[str], players: Iterable[int]) -> List[Location]:
+            """Returns the cached locations holding any of the item names for any of the players, in location order."""
+            names = set(item_names)
+            found: List[List[Tuple[Tuple[int, int], Location]]] = []
+            for player in set(players):
+                player_items = self.item_location_cache.get(player, {})
+                for item_name in names:
+                    if player_items.get(item_name):
+                        found.append(player_items[item_name])
+            if len(found) == 1:
+                return [location for _, location in found[0]]
+            return [location for _, location in heapq.merge(*found)]
+
+        @staticmethod
+        def _discard_location(locations: List[Tuple[Any, Location]], key: Any) -> None:
+            index = bisect.bisect_left(locations, (key,))
+            if index < len(locations) and locations[index][0] == key:
+                del locations[index]
+
+        def get_indexed_locations(self, index: Dict[int, List[Tuple[int, Location]]],
+                                  player: Optional[int] = None) -> List[Location]:
+            """Returns the locations of one of the fill status indexes in location_cache order."""
+            players = self.location_cache if player is None else (player,)
+            ret: List[Location] = []
+            for indexed_player in players:
+                ret += [location for _, location in index[indexed_player]]
+            return ret
 
         def __iter__(self) -> Iterator[Region]:
             for regions in self.region_cache.values():
@@ -131,6 +223,7 @@ class MultiWorld():
     def __init__(self, players: int):
         # world-local random state is saved for multiple generations running concurrently
         self.random = ThreadBarrierProxy(random.Random())
+        self._sphere_cache_lock = threading.Lock()
         self.players = players
         self.player_types = {player: NetUtils.SlotType.player for player in self.player_ids}
         self.algorithm = 'balanced'
@@ -441,26 +534,17 @@ class MultiWorld():
         return [loc.item for loc in self.get_filled_locations()] + self.itempool
 
     def find_item_locations(self, item, player: int, resolve_group_locations: bool = False) -> List[Location]:
-        if resolve_group_locations:
-            player_groups = self.get_player_groups(player)
-            return [location for location in self.get_locations() if
-                    location.item and location.item.name == item and location.player not in player_groups and
-                    (location.item.player == player or location.item.player in player_groups)]
-        return [location for location in self.get_locations() if
-                location.item and location.item.name == item and location.item.player == player]
+        return self.find_items_in_locations({item}, player, resolve_group_locations)
 
     def find_item(self, item, player: int) -> Location:
-        return next(location for location in self.get_locations() if
-                    location.item and location.item.name == item and location.item.player == player)
+        return next(iter(self.regions.find_item_locations((item,), (player,))))
 
     def find_items_in_locations(self, items: Set[str], player: int, resolve_group_locations: bool = False) -> List[Location]:
         if resolve_group_locations:
             player_groups = self.get_player_groups(player)
-            return [location for location in self.get_locations() if
-                    location.item and location.item.name in items and location.player not in player_groups and
-                    (location.item.player == player or location.item.player in player_groups)]
-        return [location for location in self.get_locations() if
-                location.item and location.item.name in items and location.item.player == player]
+            return [location for location in self.regions.find_item_locations(items, (player, *player_groups))
+                    if location.player not in player_groups]
+        return self.regions.find_item_locations(items, (player,))
 
     def create_item(self, item_name: str, player: int) -> Item:
         return self.worlds[player].create_item(item_name)
@@ -468,8 +552,10 @@ class MultiWorld():
     def push_precollected(self, item: Item):
         self.precollected_items[item.player].append(item)
         self.state.collect(item, True)
+        self.invalidate_spheres()
 
     def push_item(self, location: Location, item: Item, collect: bool = True):
+        # placing the item invalidates the sphere cache through the Location.item setter
         location.item = item
         item.location = location
         if collect:
@@ -495,10 +581,10 @@ class MultiWorld():
                                            for player in self.regions.location_cache))
 
     def get_unfilled_locations(self, player: Optional[int] = None) -> List[Location]:
-        return [location for location in self.get_locations(player) if location.item is None]
+        return self.regions.get_indexed_locations(self.regions.unfilled_location_cache, player)
 
     def get_filled_locations(self, player: Optional[int] = None) -> List[Location]:
-        return [location for location in self.get_locations(player) if location.item is not None]
+        return self.regions.get_indexed_locations(self.regions.filled_location_cache, player)
 
     def get_reachable_locations(self, state: Optional[CollectionState] = None, player: Optional[int] = None) -> List[Location]:
         state: CollectionState = state if state else self.state
@@ -506,7 +592,7 @@ class MultiWorld():
 
     def get_placeable_locations(self, state=None, player=None) -> List[Location]:
         state: CollectionState = state if state else self.state
-        return [location for location in self.get_locations(player) if location.item is None and location.can_reach(state)]
+        return [location for location in self.get_unfilled_locations(player) if location.can_reach(state)]
 
     def get_unfilled_locations_for_players(self, location_names: List[str], players: Iterable[int]):
         for player in players:
@@ -544,6 +630,10 @@ class MultiWorld():
         else:
             if self.has_beaten_game(self.state):
                 return True
+            cache = self._sphere_cache
+            if cache is not None:
+                return cache.beaten_sphere is not None
+            # computing all spheres would not stop once the game is beaten
             state = CollectionState(self)
         prog_locations = {location for location in self.get_locations() if location.item
                           and location.item.advancement and location not in state.locations_checked}
@@ -569,32 +659,74 @@ class MultiWorld():
 
         return False
 
-    def get_spheres(self) -> Iterator[Set[Location]]:
+    def invalidate_spheres(self) -> None:
+        """Drops the cached spheres, needs to be called when item placement or starting inventory changes."""
+        self._sphere_cache = None
+        self._sphere_cache_version += 1
+
+    def get_sphere_cache(self) -> SphereCache:
         """
-        yields a set of locations for each logical sphere
+        Returns the logical spheres of all locations, computing them if they are not cached.
 
-        If there are unreachable locations, the last sphere of reachable
-        locations is followed by an empty set, and then a set of all of the
-        unreachable locations.
+        The spheres get shared by get_spheres, can_beat_game without a starting state and the spoiler playthrough,
+        until items get placed or precollected. fulfills_accessibility does its own sweep, as it skips excluded
+        locations.
         """
+        cache = self._sphere_cache
+        if cache is None:
+            # other threads wait for the spheres being computed instead of computing them again
+            with self._sphere_cache_lock:
+                cache = self._sphere_cache
+                if cache is None:
+                    version = self._sphere_cache_version
+                    cache = self._compute_spheres()
+                    if version == self._sphere_cache_version:
+                        # placement may have changed while computing in another thread
+                        self._sphere_cache = cache
+        return cache
+
+    def _compute_spheres(self) -> SphereCache:
         state = CollectionState(self)
-        locations = set(self.get_filled_locations())
+        locations = set(self.get_locations())
+        spheres: List[Set[Location]] = []
+        beaten_sphere: Optional[int] = 0 if self.has_beaten_game(state) else None
 
         while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
+            sphere: Set[Location] = {location for location in locations if location.can_reach(state)}
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
                 break
 
             for location in sphere:
-                state.collect(location.item, True, location)
+                if location.item:
+                    state.collect(location.item, True, location)
             locations -= sphere
+            spheres.append(sphere)
+
+            if beaten_sphere is None and self.has_beaten_game(state):
+                beaten_sphere = len(spheres)
+
+        return SphereCache(spheres, locations, beaten_sphere)
+
+    def get_spheres(self) -> Iterator[Set[Location]]:
+        """
+        yields a set of locations for each logical sphere
+
+        If there are unreachable locations, the last sphere of reachable
+        locations is followed by an empty set, and then a set of all of the
+        unreachable locations.
+        """
+        cache = self.get_sphere_cache()
+        for sphere in cache.spheres:
+            filled_sphere = {location for location in sphere if location.item}
+            if not filled_sphere:
+                # only empty locations became reachable, so nothing further can be reached
+                break
+            yield filled_sphere
+
+        unreachable = {location for location in cache.unreachable if location.item}
+        if unreachable:
+            yield set()
+            yield unreachable
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
@@ -658,6 +790,85 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class CopyOnWriteDict(dict):
+    """
+    Per-player dict that shares its values with other copies until they are first accessed.
+
+    Values are looked up in a snapshot that is never written to and copied into this dict on first access.
+    Accessing a value cannot tell reading from writing, so the copy happens on any access through this dict.
+    """
+    __slots__ = ("_shared", "_copy_value")
+    _shared: Dict[int, Any]
+    _copy_value: Callable[[Any], Any]
+
+    def __init__(self, shared: Dict[int, Any], copy_value: Callable[[Any], Any]):
+        super().__init__()
+        self._shared = shared
+        self._copy_value = copy_value
+
+    def __missing__(self, key: int) -> Any:
+        value = self[key] = self._copy_value(self._shared[key])
+        return value
+
+    def share(self) -> Dict[int, Any]:
+        """Returns a snapshot of all current values, after which this dict may no longer write to them."""
+        if not dict.__len__(self):
+            return self._shared
+        shared = self._shared.copy()
+        shared.update(dict.items(self))
+        dict.clear(self)
+        self._shared = shared
+        return shared
+
+    def materialize(self) -> None:
+        """Copies all still shared values into this dict."""
+        if self._shared:
+            for key in self._shared.keys() - dict.keys(self):
+                dict.__setitem__(self, key, self._copy_value(self._shared[key]))
+            self._shared = {}
+
+    def __contains__(self, key: object) -> bool:
+        return dict.__contains__(self, key) or key in self._shared
+
+    def get(self, key: int, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def __iter__(self) -> Iterator[int]:
+        self.materialize()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        self.materialize()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):
+        self.materialize()
+        return dict.items(self)
+
+    def copy(self) -> Dict[int, Any]:
+        self.materialize()
+        return dict(dict.items(self))
+
+    def __eq__(self, other: object) -> bool:
+        self.materialize()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    def __repr__(self) -> str:
+        self.materialize()
+        return dict.__repr__(self)
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
@@ -718,12 +929,22 @@ class CollectionState():
                         queue.append(new_entrance)
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = copy.deepcopy(self.prog_items)
-        ret.reachable_regions = {player: copy.copy(self.reachable_regions[player]) for player in
-                                 self.reachable_regions}
-        ret.blocked_connections = {player: copy.copy(self.blocked_connections[player]) for player in
-                                   self.blocked_connections}
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
+        # per-player structures are shared between both states and only copied once a state accesses them
+        for attribute, copy_value in (("prog_items", Counter.copy),
+                                      ("reachable_regions", set.copy),
+                                      ("blocked_connections", set.copy)):
+            own: Dict[int, Any] = getattr(self, attribute)
+            if isinstance(own, CopyOnWriteDict):
+                shared = own.share()
+            else:
+                shared = own
+                setattr(self, attribute, CopyOnWriteDict(shared, copy_value))
+            setattr(ret, attribute, CopyOnWriteDict(shared, copy_value))
+        ret.stale = dict.fromkeys(self.multiworld.get_all_ids(), True)
         ret.events = copy.copy(self.events)
         ret.path = copy.copy(self.path)
         ret.locations_checked = copy.copy(self.locations_checked)
@@ -759,18 +980,32 @@ class CollectionState():
     def sweep_for_events(self, locations: Optional[Iterable[Location]] = None) -> None:
         if locations is None:
             locations = self.multiworld.get_filled_locations()
-        reachable_events = True
-        # since the loop has a good chance to run more than once, only filter the events once
-        locations = {location for location in locations if location.advancement and location not in self.events}
+        # since the loop has a good chance to run more than once, only filter the events once.
+        # Candidates are bucketed per player to gate them on that player's region reachability, but every bucket
+        # is checked again after any event is collected, as access rules may depend on other players' items.
+        pending: Dict[int, Set[Location]] = {}
+        for location in locations:
+            if location.advancement and location not in self.events:
+                pending.setdefault(location.player, set()).add(location)
 
+        reachable_events = True
         while reachable_events:
-            reachable_events = {location for location in locations if location.can_reach(self)}
-            locations -= reachable_events
+            reachable_events = [location for player_pending in pending.values()
+                                for location in player_pending if self._can_reach_sweep_candidate(location)]
             for event in reachable_events:
+                pending[event.player].remove(event)
                 self.events.add(event)
                 assert isinstance(event.item, Item), "tried to collect Event with no Item"
                 self.collect(event.item, True, event)
 
+    def _can_reach_sweep_candidate(self, location: Location) -> bool:
+        """Like location.can_reach, but skips the access rule of locations in regions that were not reached yet.
+        Regions overriding can_reach may depend on state the access rule sets up, so they are evaluated as is."""
+        region = location.parent_region
+        if type(region).can_reach is Region.can_reach and not region.can_reach(self):
+            return False
+        return location.can_reach(self)
+
     # item name related
     def has(self, item: str, player: int, count: int = 1) -> bool:
         return self.prog_items[player][item] >= count
@@ -881,13 +1116,14 @@ class CollectionState():
 
         return changed
 
-    def remove(self, item: Item):
+    def remove(self, item: Item) -> bool:
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
             self.stale[item.player] = True
+        return changed
 
 
 class Entrance:
@@ -965,13 +1201,11 @@ class Region:
         def __delitem__(self, index: int) -> None:
             location: Location = self._list.__getitem__(index)
             self._list.__delitem__(index)
-            del(self.region_manager.location_cache[location.player][location.name])
+            self.region_manager.remove_location(location)
 
         def insert(self, index: int, value: Location) -> None:
-            assert value.name not in self.region_manager.location_cache[value.player], \
-                f"{value.name} already exists in the location cache."
+            self.region_manager.add_location(value)
             self._list.insert(index, value)
-            self.region_manager.location_cache[value.player][value.name] = value
 
     class EntranceRegister(Register):
         def __delitem__(self, index: int) -> None:
@@ -1113,7 +1347,7 @@ class Location:
     always_allow = staticmethod(lambda state, item: False)
     access_rule: Callable[[CollectionState], bool] = staticmethod(lambda state: True)
     item_rule = staticmethod(lambda item: True)
-    item: Optional[Item] = None
+    _item: Optional[Item] = None
 
     def __init__(self, player: int, name: str = '', address: Optional[int] = None, parent: Optional[Region] = None):
         self.player = player
@@ -1121,6 +1355,20 @@ class Location:
         self.address = address
         self.parent_region = parent
 
+    @property
+    def item(self) -> Optional[Item]:
+        return self._item
+
+    @item.setter
+    def item(self, item: Optional[Item]) -> None:
+        previous_item = self._item
+        self._item = item
+        # keep the location indexes of the MultiWorld this location is registered in up to date
+        multiworld = self.parent_region.multiworld if self.parent_region else None
+        if multiworld and multiworld.regions.location_cache.get(self.player, {}).get(self.name) is self:
+            multiworld.regions.update_location_item(self, previous_item)
+            multiworld.invalidate_spheres()
+
     def can_fill(self, state: CollectionState, item: Item, check_access=True) -> bool:
         return ((self.always_allow(state, item) and item.name not in state.multiworld.worlds[item.player].options.non_local_items)
                 or ((self.progress_type != LocationProgressType.EXCLUDED or not (item.advancement or item.useful))
@@ -1297,12 +1545,18 @@ class Spoiler:
         state = CollectionState(multiworld)
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
+        # the spheres of all locations are shared with the other consumers, only the progress items are of interest here
+        cached_spheres = iter(multiworld.get_sphere_cache().spheres)
         while sphere_candidates:
 
             # build up spheres of collection radius.
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
 
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
+            sphere: Set[Location] = set()
+            for cached_sphere in cached_spheres:
+                sphere = cached_sphere & sphere_candidates
+                if sphere:
+                    break
 
             for location in sphere:
                 state.collect(location.item, True, location)
@@ -1352,6 +1606,7 @@ class Spoiler:
             logging.debug('Checking if %s (Player %d) is required to beat the game.', item.name, item.player)
             multiworld.precollected_items[item.player].remove(item)
             multiworld.state.remove(item)
+            multiworld.invalidate_spheres()
             if not multiworld.can_beat_game():
                 multiworld.push_precollected(item)
             else:
@@ -22,8 +22,9 @@ if __name__ == "__main__":
     Utils.init_logging("TextClient", exception_logger="Client")
 
 from MultiServer import CommandProcessor
-from NetUtils import (Endpoint, decode, NetworkItem, encode, JSONtoTextParser, ClientStatus, Permission, NetworkSlot,
-                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, SlotType)
+from NetUtils import (Endpoint, decode_frame, NetworkItem, encode, JSONtoTextParser, ClientStatus, Permission,
+                      NetworkSlot, RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes,
+                      SlotType, compressed_subprotocol)
 from Utils import Version, stream_input, async_start
 from worlds import network_data_package, AutoWorldRegister
 import os
@@ -732,7 +733,7 @@ async def server_loop(ctx: CommonContext, address: typing.Optional[str] = None)
         port = server_url.port or 38281  # raises ValueError if invalid
         socket = await websockets.connect(address, port=port, ping_timeout=None, ping_interval=None,
                                           ssl=get_ssl_context() if address.startswith("wss://") else None,
-                                          max_size=ctx.max_size)
+                                          max_size=ctx.max_size, subprotocols=[compressed_subprotocol])
         if ctx.ui is not None:
             ctx.ui.update_address_bar(server_url.netloc)
         ctx.server = Endpoint(socket)
@@ -741,7 +742,7 @@ async def server_loop(ctx: CommonContext, address: typing.Optional[str] = None)
         ctx.current_reconnect_delay = ctx.starting_reconnect_delay
         ctx.disconnected_intentionally = False
         async for data in ctx.server.socket:
-            for msg in decode(data):
+            for msg in decode_frame(data):
                 await process_server_cmd(ctx, msg)
         logger.warning(f"Disconnected from multiworld server{reconnect_hint()}")
     except websockets.InvalidMessage:
@@ -19,11 +19,16 @@ def _log_fill_progress(name: str, placed: int, total_items: int) -> None:
     logging.info(f"Current fill step ({name}) at {placed}/{total_items} items placed.")
 
 
-def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
-                    locations: typing.Optional[typing.List[Location]] = None) -> CollectionState:
+def _collect_pool(base_state: CollectionState, itempool: typing.Iterable[Item]) -> CollectionState:
     new_state = base_state.copy()
     for item in itempool:
         new_state.collect(item, True)
+    return new_state
+
+
+def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
+                    locations: typing.Optional[typing.List[Location]] = None) -> CollectionState:
+    new_state = _collect_pool(base_state, itempool)
     new_state.sweep_for_events(locations=locations)
     return new_state
 
@@ -53,6 +58,15 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
 
+    # base_state with item_pool + unplaced_items collected, kept up to date as items leave and re-enter the pool
+    # instead of collecting the whole pool again for every batch. Rebuilt if an item can't be removed cleanly.
+    pool_state: typing.Optional[CollectionState] = None
+
+    def return_to_pool(returned_items: typing.Iterable[Item]) -> None:
+        if pool_state is not None:
+            for returned_item in returned_items:
+                pool_state.collect(returned_item, True)
+
     # for progress logging
     total = min(len(item_pool), len(locations))
     placed = 0
@@ -66,9 +80,13 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                 if pool_item is item:
                     item_pool.pop(p)
                     break
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+        if pool_state is not None and not all([pool_state.remove(item) for item in items_to_place]):
+            pool_state = None
+        if pool_state is None:
+            pool_state = _collect_pool(base_state, item_pool + unplaced_items)
+        maximum_exploration_state = pool_state.copy()
+        maximum_exploration_state.sweep_for_events(locations=multiworld.get_filled_locations(item.player)
+                                                   if single_player_placement else None)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
@@ -76,6 +94,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             # if we have run out of locations to fill,break out of this loop
             if not locations:
                 unplaced_items += items_to_place
+                return_to_pool(items_to_place)
                 break
             item_to_place = items_to_place.pop(0)
 
@@ -143,6 +162,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                                 reachable_items[placed_item.player].appendleft(
                                     placed_item)
                                 item_pool.append(placed_item)
+                                return_to_pool((placed_item,))
 
                                 # cleanup at the end to hopefully get better errors
                                 cleanup_required = True
@@ -156,9 +176,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     if spot_to_fill is None:
                         # Can't place this item, move on to the next
                         unplaced_items.append(item_to_place)
+                        return_to_pool((item_to_place,))
                         continue
                 else:
                     unplaced_items.append(item_to_place)
+                    return_to_pool((item_to_place,))
                     continue
             multiworld.push_item(spot_to_fill, item_to_place, False)
             spot_to_fill.locked = lock
@@ -2,15 +2,17 @@ from __future__ import annotations
 
 import argparse
 import copy
+import json
 import logging
 import os
 import random
 import string
 import sys
+import tracemalloc
 import urllib.parse
 import urllib.request
 from collections import Counter
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Dict, Iterable, Optional, Set, Tuple, Union
 from itertools import chain
 
 import ModuleUpdate
@@ -52,6 +54,8 @@ def mystery_argparse():
     parser.add_argument("--skip_output", action="store_true",
                         help="Skips generation assertion and output stages and skips multidata and spoiler output. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--profile_imports", action="store_true",
+                        help="Log the import time, memory peak and imported modules of each world.")
     args = parser.parse_args()
     if not os.path.isabs(args.weights_file_path):
         args.weights_file_path = os.path.join(args.player_files_path, args.weights_file_path)
@@ -144,8 +148,21 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
                         f"Provide a general weights file ({args.weights_file_path}) or individual player files. "
                         f"A mix is also permitted.")
 
+    if "worlds" not in sys.modules:
+        games = get_games(yaml for yamls in weights_cache.values() for yaml in yamls)
+        if games is not None:
+            if meta_weights:
+                games.update(category_name for category_name in meta_weights if category_name)
+            # only import the worlds of games that can be rolled
+            os.environ["ARCHIPELAGO_GAMES"] = json.dumps(sorted(games))
+        if args.profile_imports:
+            tracemalloc.start()
     from worlds.AutoWorld import AutoWorldRegister
     from worlds.alttp.EntranceRandomizer import parse_arguments
+    if args.profile_imports:
+        from worlds import get_import_profile
+        logging.info(f"World import profile:\n{get_import_profile()}")
+        tracemalloc.stop()
     erargs = parse_arguments(['--multi', str(args.multi)])
     erargs.seed = seed
     erargs.plando_options = args.plando
@@ -253,6 +270,26 @@ def read_weights_yamls(path) -> Tuple[Any, ...]:
     return tuple(parse_yamls(yaml))
 
 
+def get_games(weights: Iterable[dict]) -> Optional[Set[str]]:
+    """Returns all games the weights can roll, or None if their triggers or linked options may change the game."""
+    games: Set[str] = set()
+    for yaml in weights:
+        game = yaml.get("game")
+        if isinstance(game, str):
+            games.add(game)
+        elif isinstance(game, dict):
+            games.update(name for name, weight in game.items() if weight)
+        elif isinstance(game, list):
+            games.update(game)
+        else:
+            return None
+        for option_set in (*yaml.get("triggers", ()), *yaml.get("linked_options", ())):
+            for category_name, category_options in option_set.get("options", {}).items():
+                if not category_name and any(str(key).lstrip("+-") == "game" for key in category_options):
+                    return None
+    return games
+
+
 def interpret_on_off(value) -> bool:
     return {"on": True, "off": False}.get(value, value)
 
@@ -1,19 +1,19 @@
 import collections
 import concurrent.futures
+import contextlib
 import logging
+import multiprocessing
 import os
-import pickle
 import tempfile
 import time
 import zipfile
-import zlib
 from typing import Dict, List, Optional, Set, Tuple, Union
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region
 from Fill import balance_multiworld_progression, distribute_items_restrictive, distribute_planned, flood_items
 from Options import StartInventoryPool
-from Utils import __version__, output_path, version_tuple, get_settings
+from Utils import __version__, is_linux, output_path, version_tuple, get_settings
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -21,6 +21,27 @@ from worlds.generic.Rules import exclusion_rules, locality_rules
 __all__ = ["main"]
 
 
+def _generate_output(multiworld: MultiWorld, player: int, output_directory: str) -> float:
+    """Runs generate_output of a player and returns how many seconds it took."""
+    output_start = time.perf_counter()
+    AutoWorld.call_single(multiworld, "generate_output", player, output_directory)
+    return time.perf_counter() - output_start
+
+
+_output_multiworld: Optional[MultiWorld] = None
+
+
+def _init_output_process(multiworld: MultiWorld) -> None:
+    # output processes are forked, so they get the multiworld without pickling it
+    global _output_multiworld
+    _output_multiworld = multiworld
+
+
+def _generate_output_in_process(player: int, output_directory: str) -> float:
+    assert _output_multiworld, "Output process was not initialized."
+    return _generate_output(_output_multiworld, player, output_directory)
+
+
 def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = None):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
@@ -35,6 +56,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
+    multiworld.parallel_stage_workers = get_settings().generator.parallel_stage_workers
     multiworld.plando_options = args.plando_options
     multiworld.plando_items = args.plando_items.copy()
     multiworld.plando_texts = args.plando_texts.copy()
@@ -225,14 +247,33 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     with output as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
+        process_players: List[int] = []
+        output_processes = get_settings().generator.output_processes
+        if output_processes > 0:
+            # fork is also available on macOS, but unsafe there, as system libraries may be used in threads
+            if is_linux:
+                process_players = [player for player in output_players
+                                   if multiworld.worlds[player].output_process_safe]
+            else:
+                logger.warning("Output processes are only supported on Linux, generating output in threads.")
+        thread_players = [player for player in output_players if player not in process_players]
+        process_pool_context = concurrent.futures.ProcessPoolExecutor(
+            min(output_processes, len(process_players)), multiprocessing.get_context("fork"),
+            initializer=_init_output_process, initargs=(multiworld,)) if process_players else contextlib.nullcontext()
+        with process_pool_context as process_pool, \
+                concurrent.futures.ThreadPoolExecutor(len(thread_players) + 2) as pool:
+            # submit to the process pool first, so it forks before the thread pool starts any threads
+            player_output_futures: Dict[concurrent.futures.Future, int] = {
+                process_pool.submit(_generate_output_in_process, player, temp_dir): player
+                for player in process_players
+            }
             check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
             output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
-            for player in output_players:
+            for player in thread_players:
                 # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                player_output_futures[pool.submit(_generate_output, multiworld, player, temp_dir)] = player
+            output_file_futures.extend(player_output_futures)
 
             # collect ER hint info
             er_hint_data: Dict[int, Dict[int, str]] = {}
@@ -332,11 +373,8 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 }
                 AutoWorld.call_all(multiworld, "modify_multidata", multidata)
 
-                multidata = zlib.compress(pickle.dumps(multidata), 9)
-
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(multidata)
+                    NetUtils.write_multidata(f, multidata)
 
             output_file_futures.append(pool.submit(write_multidata))
             if not check_accessibility_task.result():
@@ -351,6 +389,11 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
                 future.result()
 
+        for seconds, player in sorted(((future.result(), player) for future, player in player_output_futures.items()),
+                                      reverse=True):
+            logger.info(f"Generated output of {multiworld.get_player_name(player)} ({multiworld.game[player]}) "
+                        f"in {seconds:.2f}s{' in a separate process' if player in process_players else ''}.")
+
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
             multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
@@ -12,9 +12,11 @@ import inspect
 import itertools
 import logging
 import math
+import mmap
 import operator
 import pickle
 import random
+import struct
 import threading
 import time
 import typing
@@ -43,6 +45,7 @@ from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, Networ
     SlotType, LocationStore
 
 min_client_version = Version(0, 1, 6)
+save_journal_record_header = struct.Struct("<I")  # size of the record following it
 colorama.init()
 
 
@@ -180,6 +183,8 @@ class Context:
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
+    location_spheres: typing.Dict[int, typing.Dict[int, int]]
+    """ index of spheres as { player: { location_id: sphere } } """
     logger: logging.Logger
 
 
@@ -209,6 +214,12 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.received_items_changed: typing.Set[team_slot] = set()  # slots with items not sent by send_new_items yet
+        # messages of the location checks in the running batched_location_checks, by team and by slot,
+        # and the slots whose hints changed
+        self.location_check_batch: typing.Optional[typing.Tuple[typing.Dict[int, typing.List[dict]],
+                                                                typing.Dict[team_slot, typing.List[dict]],
+                                                                typing.Set[team_slot]]] = None
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -216,6 +227,9 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[NetUtils.Hint]] = collections.defaultdict(set)
+        # not found hints by (team, finding player, location), with the slots whose hints they are in
+        self.unfound_hints: typing.Dict[typing.Tuple[int, int, int], typing.Set[typing.Tuple[int, NetUtils.Hint]]] = \
+            collections.defaultdict(set)
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -234,6 +248,11 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
+        # state of the last save the save journal builds on, None if the next save has to be a full one
+        self._journal_base: typing.Optional[typing.Dict[str, typing.Any]] = None
+        self._journal_size = 0
+        self._snapshot_size = 0
+        self.journal_generation = 0
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -242,9 +261,12 @@ class Context:
         self.group_collected: typing.Dict[int, typing.Set[int]] = {}
         self.random = random.Random()
         self.stored_data = {}
+        # keys changed since the last save, by journaled field of get_save. Only marked changes are journaled.
+        self.save_changes: typing.DefaultDict[str, typing.Set[typing.Any]] = collections.defaultdict(set)
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
         self.read_data = {}
         self.spheres = []
+        self.location_spheres = {}
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -270,9 +292,9 @@ class Context:
             self.non_hintable_names[world_name] = world.hint_blacklist
 
         for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+            # remove groups from data sent to clients, unless an earlier Context of this process already did
+            game_package.pop("item_name_groups", None)
+            game_package.pop("location_name_groups", None)
 
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
@@ -306,7 +328,7 @@ class Context:
             return False
         msg = self.dumper(msgs)
         try:
-            await endpoint.socket.send(msg)
+            await endpoint.socket.send(NetUtils.encode_frame(msg, endpoint.compressed))
         except websockets.ConnectionClosed:
             self.logger.exception(f"Exception during send_msgs, could not send {msg}")
             await self.disconnect(endpoint)
@@ -320,7 +342,7 @@ class Context:
         if not endpoint.socket or not endpoint.socket.open:
             return False
         try:
-            await endpoint.socket.send(msg)
+            await endpoint.socket.send(NetUtils.encode_frame(msg, endpoint.compressed))
         except websockets.ConnectionClosed:
             self.logger.exception("Exception during send_encoded_msgs")
             await self.disconnect(endpoint)
@@ -332,10 +354,18 @@ class Context:
 
     async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
         sockets = []
+        compressed_sockets = []
         for endpoint in endpoints:
             if endpoint.socket and endpoint.socket.open:
-                sockets.append(endpoint.socket)
+                (compressed_sockets if endpoint.compressed else sockets).append(endpoint.socket)
         try:
+            if compressed_sockets:
+                # compressed once for all endpoints, instead of per connection by permessage-deflate
+                frame = NetUtils.encode_frame(msg, True)
+                if isinstance(frame, str):
+                    sockets += compressed_sockets
+                else:
+                    websockets.broadcast(compressed_sockets, frame)
             websockets.broadcast(sockets, msg)
         except RuntimeError:
             self.logger.exception("Exception during broadcast_send_encoded_msgs")
@@ -363,6 +393,30 @@ class Context:
         msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
+    @contextlib.contextmanager
+    def batched_location_checks(self):
+        """Collects the messages of all location checks registered within into one broadcast per team and one per slot,
+        sent with the items received at the end, followed by one notification per slot whose hints changed.
+        Nested batches are part of the outermost one."""
+        if self.location_check_batch is not None:
+            yield
+            return
+        team_msgs: typing.Dict[int, typing.List[dict]] = collections.defaultdict(list)
+        slot_msgs: typing.Dict[team_slot, typing.List[dict]] = collections.defaultdict(list)
+        changed_hints: typing.Set[team_slot] = set()
+        self.location_check_batch = team_msgs, slot_msgs, changed_hints
+        try:
+            yield
+        finally:
+            self.location_check_batch = None
+            for team, msgs in team_msgs.items():
+                self.broadcast_team(team, msgs)
+            send_new_items(self)
+            for (team, slot), msgs in slot_msgs.items():
+                self.broadcast(self.clients[team][slot], msgs)
+            for team, slot in changed_hints:
+                self.on_changed_hints(team, slot)
+
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
@@ -394,19 +448,30 @@ class Context:
                         break
                 else:
                     raise Exception("No .archipelago found in archive.")
+            decoded_obj = self.decompress(data)
         else:
             with open(multidatapath, 'rb') as f:
-                data = f.read()
+                # mapped read-only, so the location table can be used in place
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            decoded_obj = self.decompress(data, copy_locations=False)
 
-        self._load(self.decompress(data), {}, use_embedded_server_options)
+        self._load(decoded_obj, {}, use_embedded_server_options)
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
+    def decompress(data: typing.Union[bytes, mmap.mmap], copy_locations: bool = True) -> dict:
         format_version = data[0]
-        if format_version > 3:
+        if format_version > NetUtils.multidata_format_version:
             raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+        if format_version < 4:
+            return restricted_loads(zlib.decompress(data[1:]))
+        # locations are stored as packed table, which LocationStore loads without building dicts first
+        view = memoryview(data)
+        table_start = NetUtils.multidata_location_table_offset
+        table_end = table_start + NetUtils.location_table_size(view, table_start)
+        decoded_obj = restricted_loads(zlib.decompress(view[table_end:]))
+        decoded_obj["locations"] = LocationStore.from_buffer(view[table_start:table_end], copy_locations)
+        return decoded_obj
 
     def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
@@ -444,7 +509,8 @@ class Context:
         self.seed_name = decoded_obj["seed_name"]
         self.random.seed(self.seed_name)
         self.connect_names = decoded_obj['connect_names']
-        self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
+        locations = decoded_obj.pop("locations")  # pre-emptively free memory
+        self.locations = locations if isinstance(locations, LocationStore) else LocationStore(locations)
         self.slot_data = decoded_obj['slot_data']
         for slot, data in self.slot_data.items():
             self.read_data[f"slot_data_{slot}"] = lambda data=data: data
@@ -457,6 +523,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+        self.recheck_hints()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -487,6 +554,10 @@ class Context:
 
         # sorted access spheres
         self.spheres = decoded_obj.get("spheres", [])
+        self.location_spheres = {}
+        for sphere_index, sphere in enumerate(self.spheres):
+            for player, locations in sphere.items():
+                self.location_spheres.setdefault(player, {}).update(dict.fromkeys(locations, sphere_index))
 
     # saving
 
@@ -503,15 +574,17 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            self._write_journaled_save(exit_save)
         except Exception as e:
             self.logger.exception(e)
             return False
         else:
             return True
 
+    @property
+    def journal_filename(self) -> str:
+        return self.save_filename + ".journal"
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
@@ -521,15 +594,178 @@ class Context:
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
             try:
-                with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                self.set_save(self.read_save())
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
                 self.logger.exception(e)
             self._start_async_saving()
 
+    def read_save(self) -> dict:
+        """Reads the save file and applies the deltas journaled since it was written."""
+        with open(self.save_filename, 'rb') as f:
+            save_data = restricted_loads(zlib.decompress(f.read()))
+        self.journal_generation = save_data.pop("journal_generation", 0)
+        try:
+            with open(self.journal_filename, 'rb') as f:
+                journal = f.read()
+        except FileNotFoundError:
+            journal = b""
+        position = 0
+        while position + save_journal_record_header.size <= len(journal):
+            size, = save_journal_record_header.unpack_from(journal, position)
+            position += save_journal_record_header.size
+            if position + size > len(journal):
+                self.logger.warning("Ignoring the last save journal record, as it was not completely written.")
+                break
+            generation, delta = restricted_loads(zlib.decompress(journal[position:position + size]))
+            position += size
+            if generation == self.journal_generation:  # older records were compacted into the save file already
+                self.apply_save_delta(save_data, delta)
+        return save_data
+
+    def _write_save_snapshot(self, save: dict) -> int:
+        """Writes a full save and discards the journal. Returns the size of the save."""
+        generation = self.journal_generation + 1
+        encoded_save = zlib.compress(pickle.dumps(dict(save, journal_generation=generation)))
+        with open(self.save_filename, "wb") as f:
+            f.write(encoded_save)
+        self.journal_generation = generation
+        with open(self.journal_filename, "wb"):
+            pass
+        return len(encoded_save)
+
+    def _write_save_delta(self, delta: dict) -> int:
+        """Appends a delta to the journal of the last full save. Returns the size of the journal record."""
+        record = zlib.compress(pickle.dumps((self.journal_generation, delta)))
+        record = save_journal_record_header.pack(len(record)) + record
+        with open(self.journal_filename, "ab") as f:
+            f.write(record)
+        return len(record)
+
+    def _write_journaled_save(self, exit_save: bool = False):
+        """Journals the changes since the last save, or writes a full save once the journal outgrew the last one."""
+        changes, self.save_changes = self.save_changes, collections.defaultdict(set)
+        delta = None
+        if not exit_save and self._journal_size <= self._snapshot_size:
+            delta = self.get_save_delta(changes)
+        try:
+            if delta is None:
+                save = self.get_save()
+                self._snapshot_size = self._write_save_snapshot(save)
+                self._journal_size = 0
+                self._set_journal_base(save)
+            elif delta:
+                self._journal_size += self._write_save_delta(delta)
+                self._advance_journal_base(delta)
+        except BaseException:
+            # the journal may be missing changes or end in a partial record now, so start over with a full save
+            self._journal_base = None
+            raise
+
+    # fields of get_save by how their changes are journaled, from the keys marked in save_changes.
+    # The fields of get_save_state are replaced as a whole when they change.
+    journal_list_fields: typing.ClassVar[typing.Tuple[str, ...]] = ("received_items",)
+    journal_set_fields: typing.ClassVar[typing.Tuple[str, ...]] = ("location_checks",)
+    journal_dict_fields: typing.ClassVar[typing.Tuple[str, ...]] = (
+        "hints_used", "hints", "name_aliases", "client_game_state", "group_collected", "stored_data")
+    journal_pair_fields: typing.ClassVar[typing.Tuple[str, ...]] = (
+        "client_activity_timers", "client_connection_timers")
+
+    def _set_journal_base(self, save: dict):
+        self._journal_base = base = {}
+        for field in self.journal_list_fields:
+            base[field] = {key: len(items) for key, items in save[field].items()}
+        for field in self.journal_set_fields:
+            base[field] = {key: set(values) for key, values in save[field].items()}
+        for field in self.get_save_state():
+            base[field] = save[field]
+
+    def _advance_journal_base(self, delta: dict):
+        base = self._journal_base
+        for field, changes in delta.get("extend", {}).items():
+            for key, (start, items) in changes.items():
+                base[field][key] = start + len(items)
+        for field, changes in delta.get("union", {}).items():
+            for key, values in changes.items():
+                base[field].setdefault(key, set()).update(values)
+        base.update(delta.get("replace", {}))
+
+    def get_save_entry(self, field: str, value: typing.Any) -> typing.Any:
+        """Converts a value of a journaled field to how get_save stores it."""
+        if field in ("client_activity_timers", "client_connection_timers"):
+            return value.timestamp()
+        return copy.copy(value)
+
+    def get_save_delta(self, changes: typing.Dict[str, typing.Set[typing.Any]]) -> typing.Optional[dict]:
+        """Returns the changes since the last save from the keys marked in changes, to be applied to the last save with
+        apply_save_delta. None if they can't be expressed as a delta and a full save is required."""
+        base = self._journal_base
+        if base is None:
+            return None
+        delta = {"extend": {}, "union": {}, "update": {}, "update_pairs": {}, "replace": {}}
+        for field in self.journal_list_fields:
+            lengths, lists = base[field], getattr(self, field)
+            field_changes = {}
+            for key in changes.get(field, ()):
+                items = lists.get(key, [])
+                start = lengths.get(key, 0)
+                if len(items) < start:
+                    return None
+                if len(items) > start:
+                    field_changes[key] = (start, items[start:])
+            if field_changes:
+                delta["extend"][field] = field_changes
+        for field in self.journal_set_fields:
+            sets, current_sets = base[field], getattr(self, field)
+            field_changes = {}
+            for key in changes.get(field, ()):
+                values = current_sets.get(key, set())
+                old_values = sets.get(key, set())
+                if not old_values <= values:
+                    return None
+                if values != old_values:
+                    field_changes[key] = values - old_values
+            if field_changes:
+                delta["union"][field] = field_changes
+        for kind, fields in (("update", self.journal_dict_fields), ("update_pairs", self.journal_pair_fields)):
+            for field in fields:
+                values = getattr(self, field)
+                changed = {key: self.get_save_entry(field, values[key]) for key in changes.get(field, ())
+                           if key in values}
+                removed = [key for key in changes.get(field, ()) if key not in values]
+                if changed or removed:
+                    delta[kind][field] = changed, removed
+        for field, value in self.get_save_state().items():
+            if base[field] != value:
+                delta["replace"][field] = value
+        return {kind: field_changes for kind, field_changes in delta.items() if field_changes}
+
+    @staticmethod
+    def apply_save_delta(save: dict, delta: dict):
+        """Applies a delta of get_save_delta to the save it was taken from."""
+        for field, changes in delta.get("extend", {}).items():
+            lists = save.setdefault(field, {})
+            for key, (start, items) in changes.items():
+                lists[key] = lists.get(key, [])[:start] + items
+        for field, changes in delta.get("union", {}).items():
+            sets = save.setdefault(field, {})
+            for key, values in changes.items():
+                sets[key] = sets.get(key, set()) | values
+        for field, (changed, removed) in delta.get("update", {}).items():
+            values = save.setdefault(field, {})
+            values.update(changed)
+            for key in removed:
+                values.pop(key, None)
+        for field, (changed, removed) in delta.get("update_pairs", {}).items():
+            pairs = save.get(field, ())
+            values = dict(pairs)
+            values.update(changed)
+            for key in removed:
+                values.pop(key, None)
+            save[field] = type(pairs)(values.items())
+        save.update(delta.get("replace", {}))
+
     def _start_async_saving(self, atexit_save: bool = True):
         if not self.auto_saver_thread:
             def save_regularly():
@@ -558,11 +794,22 @@ class Context:
                 import atexit
                 atexit.register(self._save, True)  # make sure we save on exit too
 
-    def get_save(self) -> dict:
-        self.recheck_hints()
-        d = {
+    def get_save_state(self) -> dict:
+        """Returns the fields of get_save that are not changed by key, so they are compared and saved as a whole."""
+        return {
             "version": self.save_version,
             "connect_names": self.connect_names,
+            "random_state": self.random.getstate(),
+            "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
+                             "server_password": self.server_password, "password": self.password,
+                             "release_mode": self.release_mode,
+                             "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
+                             "item_cheat": self.item_cheat, "compatibility": self.compatibility}
+        }
+
+    def get_save(self) -> dict:
+        d = {
+            **self.get_save_state(),
             "received_items": self.received_items,
             "hints_used": dict(self.hints_used),
             "hints": dict(self.hints),
@@ -573,15 +820,8 @@ class Context:
                 (key, value.timestamp()) for key, value in self.client_activity_timers.items()),
             "client_connection_timers": tuple(
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
-            "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
             "stored_data": self.stored_data,
-            "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
-                             "server_password": self.server_password, "password": self.password,
-                             "release_mode": self.release_mode,
-                             "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
-                             "item_cheat": self.item_cheat, "compatibility": self.compatibility}
-
         }
 
         return d
@@ -604,6 +844,7 @@ class Context:
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
         self.location_checks.update(savedata["location_checks"])
+        self.recheck_hints()
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
@@ -635,23 +876,46 @@ class Context:
         return 0
 
     def recheck_hints(self, team: typing.Optional[int] = None, slot: typing.Optional[int] = None):
+        """Rechecks all hints and rebuilds unfound_hints. Location checks keep hints up to date through
+        recheck_location_hints, this is only needed after hints or location checks were replaced as a whole."""
         for hint_team, hint_slot in self.hints:
             if (team is None or team == hint_team) and (slot is None or slot == hint_slot):
                 self.hints[hint_team, hint_slot] = {
                     hint.re_check(self, hint_team) for hint in
                     self.hints[hint_team, hint_slot]
                 }
+                self.save_changes["hints"].add((hint_team, hint_slot))
+        self.unfound_hints.clear()
+        for (hint_team, hint_slot), hints in self.hints.items():
+            for hint in hints:
+                if not hint.found:
+                    self.unfound_hints[hint_team, hint.finding_player, hint.location].add((hint_slot, hint))
+
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int]):
+        """Marks the hints for newly checked locations of a slot as found and notifies the slots holding them."""
+        changed_slots: typing.Set[int] = set()
+        for location in locations:
+            for hint_slot, hint in self.unfound_hints.pop((team, slot, location), ()):
+                hints = self.hints[team, hint_slot]
+                hints.discard(hint)
+                hints.add(hint.re_check(self, team))
+                changed_slots.add(hint_slot)
+        self.save_changes["hints"].update((team, hint_slot) for hint_slot in changed_slots)
+        if self.location_check_batch is None:
+            for hint_slot in changed_slots:
+                self.on_changed_hints(team, hint_slot)
+        else:
+            self.location_check_batch[2].update((team, hint_slot) for hint_slot in changed_slots)
 
     def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
         return self.hints[team, slot]
 
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
-            for i, sphere in enumerate(self.spheres):
-                if location_id in sphere.get(player, set()):
-                    return i
+            sphere = self.location_spheres.get(player, {}).get(location_id)
+            if sphere is not None:
+                return sphere
             raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
                            f"Location or player may not exist.")
         return -1
@@ -710,12 +974,15 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.unfound_hints[team, hint.finding_player, hint.location].add((hint.finding_player, hint))
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
+                        self.unfound_hints[team, hint.finding_player, hint.location].add((player, hint))
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
+        self.save_changes["hints"].update((team, slot) for slot in new_hint_events)
         for slot in new_hint_events:
             self.on_new_hint(team, slot)
         for slot, hint_data in concerns.items():
@@ -860,12 +1127,14 @@ async def on_client_joined(ctx: Context, client: Client):
                               "you may have additional local commands you can list with /help.",
                       {"type": "Tutorial"})
     ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+    ctx.save_changes["client_connection_timers"].add((client.team, client.slot))
 
 
 async def on_client_left(ctx: Context, client: Client):
     if len(ctx.clients[client.team][client.slot]) < 1:
         update_client_status(ctx, client, ClientStatus.CLIENT_UNKNOWN)
         ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+        ctx.save_changes["client_connection_timers"].add((client.team, client.slot))
 
     version_str = '.'.join(str(x) for x in client.version)
 
@@ -940,25 +1209,33 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+    """Sends the items received since the last call to the clients of the slots that received them.
+    Clients of a slot that are at the same point of the same item lists share one encoded message."""
+    changed_slots, ctx.received_items_changed = ctx.received_items_changed, set()
+    for team, slot in changed_slots:
+        client_groups: typing.Dict[typing.Tuple[int, bool, bool], typing.List[Client]] = collections.defaultdict(list)
+        for client in ctx.clients[team][slot]:
+            if not client.no_items:
+                client_groups[client.send_index, client.remote_start_inventory, client.remote_items].append(client)
+        for (send_index, remote_start_inventory, remote_items), clients in client_groups.items():
+            start_inventory = get_start_inventory(ctx, slot, remote_start_inventory)
+            items = get_received_items(ctx, team, slot, remote_items)
+            if len(start_inventory) + len(items) > send_index:
+                first_new_item = max(0, send_index - len(start_inventory))
+                ctx.broadcast(clients, [{
+                    "cmd": "ReceivedItems",
+                    "index": send_index,
+                    "items": start_inventory[send_index:] + items[first_new_item:]}])
+                for client in clients:
                     client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
-    ctx.broadcast(ctx.clients[team][slot],
-                  [{"cmd": "RoomUpdate", "checked_locations": get_checked_checks(ctx, team, slot)}])
+    msg = {"cmd": "RoomUpdate", "checked_locations": get_checked_checks(ctx, team, slot)}
+    if ctx.location_check_batch is None:
+        ctx.broadcast(ctx.clients[team][slot], [msg])
+    else:
+        ctx.location_check_batch[1][team, slot].append(msg)
 
 
 def release_player(ctx: Context, team: int, slot: int):
@@ -978,15 +1255,17 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
     ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Collect", "team": team, "slot": slot})
-    for source_player, location_ids in all_locations.items():
-        register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
-        update_checked_locations(ctx, team, source_player)
+    with ctx.batched_location_checks():
+        for source_player, location_ids in all_locations.items():
+            register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
+            update_checked_locations(ctx, team, source_player)
 
     if not is_group:
         for group, group_players in ctx.groups.items():
             if slot in group_players:
                 group_collected_players = ctx.group_collected.setdefault(group, set())
                 group_collected_players.add(slot)
+                ctx.save_changes["group_collected"].add(group)
                 if set(group_players) == group_collected_players:
                     collect_player(ctx, team, group, True)
 
@@ -1001,6 +1280,8 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.received_items_changed.add((team, target))
+        ctx.save_changes["received_items"].update(((team, target, False), (team, target, True)))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1010,28 +1291,28 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
     if new_locations:
         if count_activity:
             ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
-        for location in new_locations:
-            item_id, target_player, flags = ctx.locations[slot][location]
-            new_item = NetworkItem(item_id, location, slot, flags)
-            send_items_to(ctx, team, target_player, new_item)
-
-            ctx.logger.info('(Team #%d) %s sent %s to %s (%s)' % (
-                team + 1, ctx.player_names[(team, slot)], ctx.item_names[ctx.slot_info[target_player].game][item_id],
-                ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[slot].game][location]))
-            info_text = json_format_send_event(new_item, target_player)
-            ctx.broadcast_team(team, [info_text])
-
-        ctx.location_checks[team, slot] |= new_locations
-        send_new_items(ctx)
-        ctx.broadcast(ctx.clients[team][slot], [{
-            "cmd": "RoomUpdate",
-            "hint_points": get_slot_points(ctx, team, slot),
-            "checked_locations": new_locations,  # send back new checks only
-        }])
-        old_hints = ctx.hints[team, slot].copy()
-        ctx.recheck_hints(team, slot)
-        if old_hints != ctx.hints[team, slot]:
-            ctx.on_changed_hints(team, slot)
+            ctx.save_changes["client_activity_timers"].add((team, slot))
+        with ctx.batched_location_checks():
+            team_msgs, slot_msgs, _ = ctx.location_check_batch
+            for location in new_locations:
+                item_id, target_player, flags = ctx.locations[slot][location]
+                new_item = NetworkItem(item_id, location, slot, flags)
+                send_items_to(ctx, team, target_player, new_item)
+
+                ctx.logger.info('(Team #%d) %s sent %s to %s (%s)' % (
+                    team + 1, ctx.player_names[(team, slot)],
+                    ctx.item_names[ctx.slot_info[target_player].game][item_id],
+                    ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[slot].game][location]))
+                team_msgs[team].append(json_format_send_event(new_item, target_player))
+
+            ctx.location_checks[team, slot] |= new_locations
+            ctx.save_changes["location_checks"].add((team, slot))
+            slot_msgs[team, slot].append({
+                "cmd": "RoomUpdate",
+                "hint_points": get_slot_points(ctx, team, slot),
+                "checked_locations": new_locations,  # send back new checks only
+            })
+        ctx.recheck_location_hints(team, slot, new_locations)
         ctx.save()
 
 
@@ -1433,12 +1714,14 @@ class ClientMessageProcessor(CommonCommandProcessor):
         if alias_name:
             alias_name = alias_name[:16].strip()
             self.ctx.name_aliases[self.client.team, self.client.slot] = alias_name
+            self.ctx.save_changes["name_aliases"].add((self.client.team, self.client.slot))
             self.output(f"Hello, {alias_name}")
             update_aliases(self.ctx, self.client.team)
             self.ctx.save()
             return True
         elif (self.client.team, self.client.slot) in self.ctx.name_aliases:
             del (self.ctx.name_aliases[self.client.team, self.client.slot])
+            self.ctx.save_changes["name_aliases"].add((self.client.team, self.client.slot))
             self.output("Removed Alias")
             update_aliases(self.ctx, self.client.team)
             self.ctx.save()
@@ -1458,6 +1741,9 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.received_items_changed.add((self.client.team, self.client.slot))
+                self.ctx.save_changes["received_items"].update(((self.client.team, self.client.slot, False),
+                                                                (self.client.team, self.client.slot, True)))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1476,9 +1762,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         cost = self.ctx.get_hint_cost(self.client.slot)
 
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.hints[self.client.team, self.client.slot]
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1568,6 +1852,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                     hints.append(hint)
                     can_pay -= 1
                     self.ctx.hints_used[self.client.team, self.client.slot] += 1
+                    self.ctx.save_changes["hints_used"].add((self.client.team, self.client.slot))
 
                 self.ctx.notify_hints(self.client.team, hints)
                 if not_found_hints:
@@ -1861,6 +2146,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
+            ctx.save_changes["stored_data"].add(args["key"])
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", True):
                 targets.add(client)
@@ -1889,6 +2175,7 @@ def update_client_status(ctx: Context, client: Client, new_status: ClientStatus)
                 ctx.broadcast_text_all(f"Team #{client.team + 1} has completed all of their games! Congratulations!")
 
         ctx.client_game_state[client.team, client.slot] = new_status
+        ctx.save_changes["client_game_state"].add((client.team, client.slot))
         ctx.on_client_status_change(client.team, client.slot)
         ctx.save()
 
@@ -1946,12 +2233,14 @@ class ServerCommandProcessor(CommonCommandProcessor):
                     if alias_name:
                         alias_name = alias_name.strip()[:15]
                         self.ctx.name_aliases[team, slot] = alias_name
+                        self.ctx.save_changes["name_aliases"].add((team, slot))
                         self.output(f"Named {player_name} as {alias_name}")
                         update_aliases(self.ctx, team)
                         self.ctx.save()
                         return True
                     else:
                         del (self.ctx.name_aliases[team, slot])
+                        self.ctx.save_changes["name_aliases"].add((team, slot))
                         self.output(f"Removed Alias for {player_name}")
                         update_aliases(self.ctx, team)
                         self.ctx.save()
@@ -2362,7 +2651,9 @@ async def main(args: argparse.Namespace):
 
     ssl_context = load_server_cert(args.cert, args.cert_key) if args.cert else None
 
-    ctx.server = websockets.serve(functools.partial(server, ctx=ctx), host=ctx.host, port=ctx.port, ssl=ssl_context)
+    ctx.server = websockets.serve(functools.partial(server, ctx=ctx), host=ctx.host, port=ctx.port, ssl=ssl_context,
+                                  subprotocols=[NetUtils.compressed_subprotocol],
+                                  process_request=NetUtils.skip_deflate)
     ip = args.host if args.host else Utils.get_public_ipv4()
     logging.info('Hosting game at %s:%d (%s)' % (ip, ctx.port,
                                                  'No password' if not ctx.password else 'Password: %s' % ctx.password))
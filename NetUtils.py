@@ -2,10 +2,16 @@ from __future__ import annotations
 
 import typing
 import enum
+import math
+import pickle
+import struct
 import warnings
-from json import JSONEncoder, JSONDecoder
+import zlib
+from json import JSONDecoder
+from json.encoder import encode_basestring as _encode_string
 
 import websockets
+from websockets.headers import parse_subprotocol
 
 from Utils import ByValue, Version
 
@@ -82,27 +88,108 @@ class NetworkItem(typing.NamedTuple):
     flags: int = 0
 
 
-def _scan_for_TypedTuples(obj: typing.Any) -> typing.Any:
+# encode serializes into the JSON of the stdlib JSONEncoder, with NamedTuples as objects with an additional "class" key,
+# in a single pass. Encoders by exact type, other types are encoded by _encode_other.
+_json_encoders: typing.Dict[type, typing.Callable[[typing.Any], str]] = {}
+
+
+def _encode_json(obj: typing.Any) -> str:
+    encoder = _json_encoders.get(type(obj))
+    if encoder is None:
+        return _encode_other(obj)
+    return encoder(obj)
+
+
+def _encode_float(obj: float) -> str:
+    if obj != obj:
+        return "NaN"
+    if obj == math.inf:
+        return "Infinity"
+    if obj == -math.inf:
+        return "-Infinity"
+    return float.__repr__(obj)
+
+
+def _encode_key(key: typing.Any) -> str:
+    if isinstance(key, str):
+        return _encode_string(key)
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return f'"{int.__repr__(key)}"'
+    if isinstance(key, float):
+        return f'"{_encode_float(key)}"'
+    raise TypeError(f"keys must be str, int, float, bool or None, not {key.__class__.__name__}")
+
+
+def _encode_array(obj: typing.Iterable[typing.Any]) -> str:
+    return "[" + ",".join([_encode_json(value) for value in obj]) + "]"
+
+
+def _encode_object(obj: typing.Mapping[typing.Any, typing.Any]) -> str:
+    return "{" + ",".join([(_encode_string(key) if type(key) is str else _encode_key(key)) + ":" + _encode_json(value)
+                           for key, value in obj.items()]) + "}"
+
+
+def _make_typed_tuple_encoder(cls: typing.Type[typing.NamedTuple]) -> typing.Callable[[typing.NamedTuple], str]:
+    keys = [("," if index else "{") + _encode_string(field) + ":" for index, field in enumerate(cls._fields)]
+    end = ',"class":' + _encode_string(cls.__name__) + "}"
+
+    def encode_typed_tuple(obj: typing.NamedTuple) -> str:
+        return "".join([key + _encode_json(value) for key, value in zip(keys, obj)]) + end
+
+    return encode_typed_tuple
+
+
+def _encode_network_item(obj: NetworkItem) -> str:
+    item, location, player, flags = obj
+    if type(item) is int and type(location) is int and type(player) is int and type(flags) is int:
+        return '{"item":%d,"location":%d,"player":%d,"flags":%d,"class":"NetworkItem"}' % obj
+    return _encode_network_item_fields(obj)
+
+
+def _encode_other(obj: typing.Any) -> str:
+    """Encodes subclasses of the JSON types, like IntEnum, and NamedTuples without an encoder yet."""
     if isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent class
-        data = obj._asdict()
-        data["class"] = obj.__class__.__name__
-        return data
+        encoder = _json_encoders[type(obj)] = _make_typed_tuple_encoder(type(obj))
+        return encoder(obj)
+    if isinstance(obj, str):
+        return _encode_string(obj)
+    if isinstance(obj, int):
+        return int.__repr__(obj)
+    if isinstance(obj, float):
+        return _encode_float(obj)
     if isinstance(obj, (tuple, list, set, frozenset)):
-        return tuple(_scan_for_TypedTuples(o) for o in obj)
+        return _encode_array(obj)
     if isinstance(obj, dict):
-        return {key: _scan_for_TypedTuples(value) for key, value in obj.items()}
-    return obj
-
-
-_encode = JSONEncoder(
-    ensure_ascii=False,
-    check_circular=False,
-    separators=(',', ':'),
-).encode
+        return _encode_object(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+_encode_network_item_fields = _make_typed_tuple_encoder(NetworkItem)
+_json_encoders.update({
+    str: _encode_string,
+    int: int.__repr__,
+    bool: lambda obj: "true" if obj else "false",
+    type(None): lambda obj: "null",
+    float: _encode_float,
+    list: _encode_array,
+    tuple: _encode_array,
+    set: _encode_array,
+    frozenset: _encode_array,
+    dict: _encode_object,
+    NetworkItem: _encode_network_item,
+    NetworkPlayer: _make_typed_tuple_encoder(NetworkPlayer),
+    NetworkSlot: _make_typed_tuple_encoder(NetworkSlot),
+})
 
 
 def encode(obj: typing.Any) -> str:
-    return _encode(_scan_for_TypedTuples(obj))
+    return _encode_json(obj)
 
 
 def get_any_version(data: dict) -> Version:
@@ -138,12 +225,45 @@ def _object_hook(o: typing.Any) -> typing.Any:
 
 decode = JSONDecoder(object_hook=_object_hook).decode
 
+compressed_subprotocol = "archipelago.zlib"
+"""WebSocket subprotocol in which the server may send large messages as binary frames of zlib compressed JSON."""
+compression_threshold = 1024
+"""Messages shorter than this are sent as text frames even with compressed_subprotocol, as they barely compress."""
+
+
+def encode_frame(msg: str, compressed: bool) -> typing.Union[str, bytes]:
+    """Returns the WebSocket frame of an encoded message, compressed if it is large and compressed is set."""
+    if compressed and len(msg) >= compression_threshold:
+        return zlib.compress(msg.encode("utf-8"))
+    return msg
+
+
+async def skip_deflate(path: str, request_headers: websockets.Headers) -> None:
+    """
+    process_request hook for servers, ignoring the permessage-deflate offer of clients offering compressed_subprotocol,
+    as their large messages are already compressed.
+    """
+    if "Sec-WebSocket-Extensions" in request_headers and any(
+            compressed_subprotocol in parse_subprotocol(value)
+            for value in request_headers.get_all("Sec-WebSocket-Protocol")):
+        del request_headers["Sec-WebSocket-Extensions"]
+
+
+def decode_frame(data: typing.Union[str, bytes]) -> typing.Any:
+    """Decodes a WebSocket frame, either JSON text or zlib compressed JSON."""
+    if isinstance(data, bytes):
+        data = zlib.decompress(data).decode("utf-8")
+    return decode(data)
+
 
 class Endpoint:
     socket: websockets.WebSocketServerProtocol
+    compressed: bool
+    """Whether the connection negotiated compressed_subprotocol."""
 
     def __init__(self, socket):
         self.socket = socket
+        self.compressed = getattr(socket, "subprotocol", None) == compressed_subprotocol
 
 
 class HandlerMeta(type):
@@ -347,6 +467,56 @@ class Hint(typing.NamedTuple):
         return self.receiving_player == self.finding_player
 
 
+multidata_format_version = 4
+"""Multidata files of this version start with a packed location table, followed by the zlib compressed pickle."""
+multidata_location_table_offset = 8
+"""The version byte is padded, so location table entries stay 8 byte aligned."""
+location_table_header = struct.Struct("<IIQ")
+"""Header of a packed location table: player count, reserved and location count."""
+location_table_entry = struct.Struct("<qIIqI4x")
+"""Entry of a packed location table: location, sender, receiver, item and flags. Matches _speedups.LocationEntry."""
+
+
+def pack_locations(locations: typing.Mapping[int, typing.Mapping[int, typing.Sequence[int]]]
+                   ) -> typing.Iterator[bytes]:
+    """Yields a packed location table for multidata locations, sorted by sender and location id."""
+    yield location_table_header.pack(len(locations), 0,
+                                     sum(len(player_locations) for _, player_locations in locations.items()))
+    pack = location_table_entry.pack
+    for sender, player_locations in sorted(locations.items()):
+        yield b"".join(pack(location, sender, data[1], data[0], data[2] if len(data) > 2 else 0)
+                       for location, data in sorted(player_locations.items()))
+
+
+def location_table_size(buffer: typing.Union[bytes, memoryview], offset: int = 0) -> int:
+    """Returns the size in bytes of the packed location table starting at offset."""
+    _, _, count = location_table_header.unpack_from(buffer, offset)
+    return location_table_header.size + count * location_table_entry.size
+
+
+class _CompressedWriter:
+    def __init__(self, file: typing.BinaryIO, level: int):
+        self.file = file
+        self.compressor = zlib.compressobj(level)
+
+    def write(self, data: bytes) -> int:
+        self.file.write(self.compressor.compress(data))
+        return len(data)
+
+    def flush(self) -> None:
+        self.file.write(self.compressor.flush())
+
+
+def write_multidata(file: typing.BinaryIO, multidata: typing.Dict[str, typing.Any]) -> None:
+    """Writes multidata, with its locations as packed table, streaming the rest through pickle and zlib."""
+    file.write(bytes([multidata_format_version]).ljust(multidata_location_table_offset, b"\0"))
+    for chunk in pack_locations(multidata["locations"]):
+        file.write(chunk)
+    writer = _CompressedWriter(file, 9)
+    pickle.dump({key: value for key, value in multidata.items() if key != "locations"}, writer)
+    writer.flush()
+
+
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
@@ -360,12 +530,39 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
-    def find_item(self, slots: typing.Set[int], seeked_item_id: int
-                  ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        # (item, receiver) -> (position, hint data), position keeps find_item in iteration order across receivers
+        self._item_index: typing.Dict[typing.Tuple[int, int],
+                                      typing.List[typing.Tuple[int, typing.Tuple[int, int, int, int, int]]]] = {}
+        position = 0
         for finding_player, check_data in self.items():
             for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+                self._item_index.setdefault((item_id, receiving_player), []).append(
+                    (position, (finding_player, location_id, item_id, receiving_player, item_flags)))
+                position += 1
+
+    @classmethod
+    def from_buffer(cls, buffer: typing.Union[bytes, memoryview], copy: bool = True) -> _LocationStore:
+        """Loads a packed location table, as written by pack_locations. Always copies into dicts."""
+        player_count, _, count = location_table_header.unpack_from(buffer)
+        entries_end = location_table_header.size + count * location_table_entry.size
+        if len(buffer) < entries_end:
+            raise ValueError("Location table is truncated")
+        locations: typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]] = {
+            player: {} for player in range(1, player_count + 1)}
+        for location, sender, receiver, item, flags in \
+                location_table_entry.iter_unpack(buffer[location_table_header.size:entries_end]):
+            if sender not in locations:
+                raise ValueError(f"Invalid player id {sender} for location")
+            locations[sender][location] = item, receiver, flags
+        return cls(locations)
+
+    def find_item(self, slots: typing.Set[int], seeked_item_id: int
+                  ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        found = [entry for slot in slots for entry in self._item_index.get((seeked_item_id, slot), ())]
+        if len(slots) > 1:
+            found.sort()
+        for _, hint_data in found:
+            yield hint_data
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
         import collections
@@ -427,3 +624,10 @@ else:
             warnings.warn("_speedups not available. Falling back to pure python LocationStore. "
                           "Install a matching C++ compiler for your platform to compile _speedups.")
             LocationStore = _LocationStore
+
+    try:
+        from _speedups import JSONEncoder as _JSONEncoder
+    except ImportError:  # already warned about above, or _speedups predates JSONEncoder
+        pass
+    else:
+        encode = _JSONEncoder(_json_encoders, _encode_other).encode  # noqa: F811
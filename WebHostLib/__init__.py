@@ -52,6 +52,8 @@ app.config["PONY"] = {
 app.config["MAX_ROLL"] = 20
 app.config["CACHE_TYPE"] = "SimpleCache"
 app.config["HOST_ADDRESS"] = ""
+# local UDP port web processes notify the room launcher on about commands and room activity. None to only poll the DB
+app.config["ROOM_NOTIFICATION_PORT"] = None
 app.config["ASSET_RIGHTS"] = False
 
 cache = Cache()
@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import logging
 import multiprocessing
+import time
 import typing
 from datetime import timedelta, datetime
 from threading import Event, Thread
@@ -12,6 +13,7 @@ from pony.orm import db_session, select, commit
 
 from Utils import restricted_loads
 from .locker import Locker, AlreadyRunningException
+from .notifications import RoomNotificationListener
 
 _stop_event = Event()
 
@@ -69,6 +71,34 @@ def cleanup():
         # Command gets deleted by ponyorm Cascade Delete, as Room is Required
     if rooms or seeds or slots:
         logging.info(f"{rooms} Rooms, {seeds} Seeds and {slots} Slots have been deleted.")
+    multidata = clean_multidata_cache()
+    if multidata:
+        logging.info(f"{multidata} cached multidata files have been deleted.")
+
+
+def is_room_active(room: Room) -> bool:
+    return room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5)
+
+
+def start_active_rooms(hosters: typing.List[MultiworldInstance]):
+    with db_session:
+        rooms = select(
+            room for room in Room if
+            room.last_activity >= datetime.utcnow() - timedelta(days=3))
+        for room in rooms:
+            # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
+            if is_room_active(room):
+                hosters[room.id.int % len(hosters)].start_room(room.id)
+
+
+def start_notified_room(hosters: typing.List[MultiworldInstance], room_id: UUID):
+    """Start a room notified of activity if it isn't running, or wake it for its new commands if it is."""
+    with db_session:
+        room = Room.get(id=room_id)
+        if room and is_room_active(room):
+            hoster = hosters[room.id.int % len(hosters)]
+            hoster.start_room(room.id)
+            hoster.notify_room(room.id)
 
 
 def autohost(config: dict):
@@ -83,15 +113,26 @@ def autohost(config: dict):
                     hosters.append(hoster)
                     hoster.start()
 
-                while not stop_event.wait(0.1):
-                    with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
-                        for room in rooms:
-                            # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                listener = RoomNotificationListener.create(config)
+                poll_interval = 0.1
+                next_poll = time.monotonic()
+                try:
+                    while not stop_event.is_set():
+                        if time.monotonic() >= next_poll:
+                            next_poll = time.monotonic() + poll_interval
+                            start_active_rooms(hosters)
+                        timeout = max(0.0, next_poll - time.monotonic())
+                        if listener is None:
+                            stop_event.wait(timeout)
+                        else:
+                            # wait in short steps to notice the stop event
+                            for room_id in listener.receive(min(timeout, 0.5)):
+                                start_notified_room(hosters, room_id)
+                                # notifications arrive, so polling only has to catch ones that got lost
+                                poll_interval = 5
+                finally:
+                    if listener:
+                        listener.close()
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -149,6 +190,7 @@ class MultiworldInstance():
         self.host = config["HOST_ADDRESS"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.rooms_notified = multiprocessing.Queue()
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -158,7 +200,7 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down, self.rooms_notified),
                                           name=self.name)
         process.start()
         self.process = process
@@ -172,6 +214,11 @@ class MultiworldInstance():
             self.room_ids.add(room_id)
             self.rooms_to_start.put(room_id)
 
+    def notify_room(self, room_id):
+        """Wake the command listener of a hosted room, so it doesn't wait for its next poll."""
+        if room_id in self.room_ids:
+            self.rooms_notified.put(room_id)
+
     def stop(self):
         if self.process:
             self.process.terminate()
@@ -186,5 +233,5 @@ class MultiworldInstance():
 
 
 from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
+from .customserver import run_server_process, get_static_server_data, clean_multidata_cache
 from .generate import gen_game
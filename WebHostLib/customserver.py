@@ -5,7 +5,9 @@ import collections
 import datetime
 import functools
 import logging
+import mmap
 import multiprocessing
+import os
 import pickle
 import random
 import socket
@@ -13,6 +15,7 @@ import threading
 import time
 import typing
 import sys
+from uuid import UUID
 
 import websockets
 from pony.orm import commit, db_session, select
@@ -20,9 +23,11 @@ from pony.orm import commit, db_session, select
 import Utils
 
 from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
-from Utils import restricted_loads, cache_argsless
+from NetUtils import compressed_subprotocol, skip_deflate
+from Utils import cache_argsless
+from .datapackage import DecodedDataPackage, NameLookup, get_data_package, get_static_data_packages
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, Room, SaveDelta, Seed, db
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -34,11 +39,13 @@ class CustomClientMessageProcessor(ClientMessageProcessor):
         """
         if platform.lower().startswith("t"):  # twitch
             self.ctx.video[self.client.team, self.client.slot] = "Twitch", user
+            self.ctx.save_changes["video"].add((self.client.team, self.client.slot))
             self.ctx.save()
             self.output(f"Registered Twitch Stream https://www.twitch.tv/{user}")
             return True
         elif platform.lower().startswith("y"):  # youtube
             self.ctx.video[self.client.team, self.client.slot] = "Youtube", user
+            self.ctx.save_changes["video"].add((self.client.team, self.client.slot))
             self.ctx.save()
             self.output(f"Registered Youtube Stream for {user}")
             return True
@@ -59,6 +66,7 @@ class DBCommandProcessor(ServerCommandProcessor):
 
 class WebHostContext(Context):
     room_id: int
+    data_packages: typing.Dict[str, DecodedDataPackage]
 
     def __init__(self, static_server_data: dict, logger: logging.Logger):
         # static server data is used during _load_game_data to load required data,
@@ -69,6 +77,7 @@ class WebHostContext(Context):
                                              "enabled", 0, 2, logger=logger)
         del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
+        self.commands_notified = threading.Event()  # set when the room was notified of new commands
         self.video = {}
         self.tags = ["AP", "WebHost"]
 
@@ -77,6 +86,40 @@ class WebHostContext(Context):
             # NOTE: attributes are mutable and shared, so they will have to be copied before being modified
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
+        self.data_packages = get_static_data_packages(self.gamespackage, self.item_name_groups,
+                                                      self.location_name_groups)
+
+    def _init_game_data(self):
+        # look up names in the shared tables of the decoded data packages instead of building them for each room
+        self.item_names = collections.defaultdict(
+            lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown item (ID:{code})'))
+        self.location_names = collections.defaultdict(
+            lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown location (ID:{code})'))
+        archipelago = self.get_decoded_data_package("Archipelago") if "Archipelago" in self.gamespackage else None
+        for game_name in self.gamespackage:
+            package = self.get_decoded_data_package(game_name)
+            if package.checksum:
+                self.checksums[game_name] = package.checksum
+            item_tables = [package.item_id_to_name]
+            location_tables = [package.location_id_to_name]
+            if archipelago and package is not archipelago:
+                # Add Archipelago items and locations to each data package, taking precedence over the game's own.
+                item_tables.insert(0, archipelago.item_id_to_name)
+                location_tables.insert(0, archipelago.location_id_to_name)
+            self.item_names[game_name] = NameLookup(lambda code: f'Unknown item (ID:{code})', *item_tables)
+            self.location_names[game_name] = NameLookup(lambda code: f'Unknown location (ID:{code})',
+                                                        *location_tables)
+            self.all_item_and_group_names[game_name] = package.all_item_and_group_names
+            self.all_location_and_group_names[game_name] = package.all_location_and_group_names
+
+    def get_decoded_data_package(self, game: str) -> DecodedDataPackage:
+        package = self.data_packages.get(game)
+        if package is None or package.data is not self.gamespackage[game]:
+            # embedded in the multidata, only used by this room
+            package = DecodedDataPackage(self.gamespackage[game], self.item_name_groups.get(game, {}),
+                                         self.location_name_groups.get(game, {}))
+            self.data_packages[game] = package
+        return package
 
     def listen_to_db_commands(self):
         cmdprocessor = DBCommandProcessor(self)
@@ -89,7 +132,9 @@ class WebHostContext(Context):
                         self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
                         command.delete()
                     commit()
-            time.sleep(5)
+            # new commands are usually notified, polling is the fallback
+            self.commands_notified.wait(5)
+            self.commands_notified.clear()
 
     @db_session
     def load(self, room_id: int):
@@ -100,66 +145,149 @@ class WebHostContext(Context):
         else:
             self.port = get_random_port()
 
-        multidata = self.decompress(room.seed.multidata)
-        game_data_packages = {}
+        multidata = self.decompress(get_seed_multidata(room.seed), copy_locations=False)
 
-        static_gamespackage = self.gamespackage  # this is shared across all rooms
+        static_data_packages = self.data_packages  # this is shared across all rooms
+        static_gamespackage = self.gamespackage
         static_item_name_groups = self.item_name_groups
         static_location_name_groups = self.location_name_groups
-        self.gamespackage = {"Archipelago": static_gamespackage.get("Archipelago", {})}  # this may be modified by _load
-        self.item_name_groups = {"Archipelago": static_item_name_groups.get("Archipelago", {})}
-        self.location_name_groups = {"Archipelago": static_location_name_groups.get("Archipelago", {})}
-
+        self.data_packages = {}
+        self.gamespackage = {}  # this may be modified by _load
+        self.item_name_groups = {}
+        self.location_name_groups = {}
+        if "Archipelago" in static_data_packages:
+            self.use_data_package("Archipelago", static_data_packages["Archipelago"])
+
+        all_static = True
         for game in list(multidata.get("datapackage", {})):
             game_data = multidata["datapackage"][game]
             if "checksum" in game_data:
-                if static_gamespackage.get(game, {}).get("checksum") == game_data["checksum"]:
-                    # non-custom. remove from multidata and use static data
-                    # games package could be dropped from static data once all rooms embed data package
+                package = get_data_package(game_data["checksum"])
+                # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
+                if package:
+                    # use the shared decoded data package instead of loading the embedded one
                     del multidata["datapackage"][game]
+                    self.use_data_package(game, package)
+                    all_static = all_static and package is static_data_packages.get(game)
+                    continue
                 else:
-                    row = GameDataPackage.get(checksum=game_data["checksum"])
-                    if row:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
-                        game_data_packages[game] = Utils.restricted_loads(row.data)
-                        continue
-                    else:
-                        self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
-            self.gamespackage[game] = static_gamespackage.get(game, {})
-            self.item_name_groups[game] = static_item_name_groups.get(game, {})
-            self.location_name_groups[game] = static_location_name_groups.get(game, {})
-
-        if not game_data_packages:
+                    self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
+            all_static = False
+            if game in static_data_packages:
+                self.use_data_package(game, static_data_packages[game])
+            else:
+                self.gamespackage[game] = {}
+                self.item_name_groups[game] = {}
+                self.location_name_groups[game] = {}
+
+        if all_static:
             # all static -> use the static dicts directly
+            # games package could be dropped from static data once all rooms embed data package
+            self.data_packages = static_data_packages
             self.gamespackage = static_gamespackage
             self.item_name_groups = static_item_name_groups
             self.location_name_groups = static_location_name_groups
-        return self._load(multidata, game_data_packages, True)
+        return self._load(multidata, {}, True)
+
+    def use_data_package(self, game: str, package: DecodedDataPackage):
+        self.data_packages[game] = package
+        self.gamespackage[game] = package.data
+        self.item_name_groups[game] = package.item_name_groups
+        self.location_name_groups[game] = package.location_name_groups
 
     @db_session
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
-            savegame_data = Room.get(id=self.room_id).multisave
+            savegame_data = Room.get(id=self.room_id).get_multisave()
             if savegame_data:
-                self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+                self.set_save(savegame_data)
             self._start_async_saving(atexit_save=False)
         threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
+        self._write_journaled_save(exit_save)
         room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
         return True
 
+    def _write_save_snapshot(self, save: dict) -> int:
+        room = Room.get(id=self.room_id)
+        room.multisave = pickle.dumps(save)
+        room.save_deltas.select().delete(bulk=True)
+        commit()
+        return len(room.multisave)
+
+    def _write_save_delta(self, delta: dict) -> int:
+        data = pickle.dumps(delta)
+        SaveDelta(room=Room.get(id=self.room_id), data=data)
+        commit()
+        return len(data)
+
+    journal_pair_fields = Context.journal_pair_fields + ("video",)
+
     def get_save(self) -> dict:
         d = super(WebHostContext, self).get_save()
         d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
         return d
 
 
+multidata_cache_max_age = datetime.timedelta(days=7)
+"""Cached multidata of seeds that were not hosted for this long is deleted by clean_multidata_cache."""
+
+
+def get_seed_multidata(seed: Seed) -> typing.Union[bytes, mmap.mmap]:
+    """Maps the multidata of a seed from the cache, so all rooms of the seed share its location table in memory."""
+    path = Utils.cache_path("multidata", f"{seed.id}.archipelago")
+    try:
+        if os.path.exists(path):
+            os.utime(path)  # keeps it from being cleaned up
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # another hoster may be writing the same seed, so write it to a unique file and swap that in
+            temp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(seed.multidata)
+            os.replace(temp_path, path)
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as e:
+        logging.warning(f"Could not map multidata of seed {seed.id}, loading it into memory instead: {e}")
+        return seed.multidata
+
+
+def clean_multidata_cache() -> int:
+    """Deletes cached multidata of deleted seeds and of seeds not hosted within multidata_cache_max_age."""
+    try:
+        entries = list(os.scandir(Utils.cache_path("multidata")))
+    except FileNotFoundError:
+        return 0
+    oldest = time.time() - multidata_cache_max_age.total_seconds()
+    deleted = 0
+    with db_session:
+        for entry in entries:
+            name, extension = os.path.splitext(entry.name)
+            if extension == ".archipelago":
+                try:
+                    seed_id = UUID(name)
+                except ValueError:
+                    continue
+                if entry.stat().st_mtime >= oldest and Seed.exists(id=seed_id):
+                    continue
+            elif extension != ".tmp" or entry.stat().st_mtime >= oldest:  # unfinished write
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError as e:  # may still be mapped by a room on Windows
+                logging.debug(f"Could not delete cached multidata {entry.name}: {e}")
+            else:
+                deleted += 1
+    return deleted
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
@@ -215,7 +343,8 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       rooms_notified: multiprocessing.Queue):
     Utils.init_logging(name)
     try:
         import resource
@@ -241,6 +370,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    contexts: typing.Dict[typing.Any, WebHostContext] = {}  # running rooms by id
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -248,15 +378,18 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logger = set_up_logging(room_id)
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
+                contexts[room_id] = ctx
                 ctx.init_save()
                 try:
                     ctx.server = websockets.serve(
-                        functools.partial(server, ctx=ctx), ctx.host, ctx.port, ssl=ssl_context)
+                        functools.partial(server, ctx=ctx), ctx.host, ctx.port, ssl=ssl_context,
+                        subprotocols=[compressed_subprotocol], process_request=skip_deflate)
 
                     await ctx.server
                 except OSError:  # likely port in use
                     ctx.server = websockets.serve(
-                        functools.partial(server, ctx=ctx), ctx.host, 0, ssl=ssl_context)
+                        functools.partial(server, ctx=ctx), ctx.host, 0, ssl=ssl_context,
+                        subprotocols=[compressed_subprotocol], process_request=skip_deflate)
 
                     await ctx.server
                 port = 0
@@ -308,6 +441,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                                              datetime.timedelta(minutes=1, seconds=room.timeout)
                     logging.info(f"Shutting down room {room_id} on {name}.")
                 finally:
+                    contexts.pop(room_id, None)
                     await asyncio.sleep(5)
                     rooms_shutting_down.put(room_id)
 
@@ -332,9 +466,16 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logging.info(f"Starting room {next_room} on {name}.")
                 del task  # delete reference to task object
 
+    def wake_notified_rooms():
+        while 1:
+            ctx = contexts.get(rooms_notified.get(block=True, timeout=None))
+            if ctx:
+                ctx.commands_notified.set()
+
     starter = Starter()
     starter.daemon = True
     starter.start()
+    threading.Thread(target=wake_notified_rooms, name="RoomNotifier", daemon=True).start()
     try:
         loop.run_forever()
     finally:
@@ -0,0 +1,108 @@
+"""
+Decoded data packages, shared by all rooms and trackers of a process. Rooms of the same games share the same
+lookup tables instead of each decoding and inverting their own copy, so they have to be treated as read-only.
+"""
+from __future__ import annotations
+
+import collections
+import threading
+import typing
+
+from pony.orm import db_session
+
+from Utils import restricted_loads
+from .models import GameDataPackage
+
+max_cached_data_packages = 64
+"""How many data packages loaded from the database are kept, on top of the data packages of installed worlds."""
+
+
+class DecodedDataPackage:
+    """A game's data package with its lookup tables."""
+    data: typing.Dict[str, typing.Any]
+    """The data package without groups, as sent to clients."""
+    checksum: typing.Optional[str]
+    item_name_groups: typing.Dict[str, typing.Set[str]]
+    location_name_groups: typing.Dict[str, typing.Set[str]]
+    item_id_to_name: typing.Dict[int, str]
+    location_id_to_name: typing.Dict[int, str]
+    all_item_and_group_names: typing.FrozenSet[str]
+    all_location_and_group_names: typing.FrozenSet[str]
+
+    def __init__(self, data: typing.Dict[str, typing.Any], item_name_groups: typing.Dict[str, typing.Set[str]],
+                 location_name_groups: typing.Dict[str, typing.Set[str]]):
+        self.data = data
+        self.checksum = data.get("checksum")
+        self.item_name_groups = item_name_groups
+        self.location_name_groups = location_name_groups
+        self.item_id_to_name = {item_id: name for name, item_id in data["item_name_to_id"].items()}
+        self.location_id_to_name = {location_id: name for name, location_id in data["location_name_to_id"].items()}
+        self.all_item_and_group_names = frozenset(data["item_name_to_id"]) | frozenset(item_name_groups)
+        self.all_location_and_group_names = frozenset(data["location_name_to_id"]) | frozenset(location_name_groups)
+
+    @classmethod
+    def from_game_package(cls, game_package: typing.Dict[str, typing.Any]) -> DecodedDataPackage:
+        """Decodes a data package that still contains its groups, as stored in the database."""
+        data = {key: value for key, value in game_package.items()
+                if key not in ("item_name_groups", "location_name_groups")}
+        return cls(data, game_package.get("item_name_groups", {}), game_package.get("location_name_groups", {}))
+
+
+class NameLookup(collections.ChainMap):
+    """Looks up names in shared id to name tables, naming unknown ids with default_factory without storing them."""
+
+    def __init__(self, default_factory: typing.Callable[[int], str], *maps: typing.Mapping[int, str]):
+        super().__init__(*maps)
+        self.default_factory = default_factory
+
+    def __missing__(self, key: int) -> str:
+        return self.default_factory(key)
+
+
+_lock = threading.Lock()
+_static_data_packages: typing.Dict[str, DecodedDataPackage] = {}
+_pinned: typing.Dict[str, DecodedDataPackage] = {}
+_cached: typing.OrderedDict[str, DecodedDataPackage] = collections.OrderedDict()
+
+
+def get_static_data_packages(gamespackage: typing.Dict[str, typing.Dict[str, typing.Any]],
+                             item_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]],
+                             location_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]) \
+        -> typing.Dict[str, DecodedDataPackage]:
+    """Returns the decoded data packages of installed worlds by game, decoding them on first use.
+    These are never evicted, and get_data_package finds them by checksum without a database query."""
+    with _lock:
+        if not _static_data_packages:
+            for game, data in gamespackage.items():
+                package = DecodedDataPackage(data, item_name_groups.get(game, {}),
+                                             location_name_groups.get(game, {}))
+                _static_data_packages[game] = package
+                if package.checksum:
+                    _pinned[package.checksum] = package
+        return _static_data_packages
+
+
+def get_data_package(checksum: str) -> typing.Optional[DecodedDataPackage]:
+    """Returns the decoded data package with the checksum, or None if it is not in the database."""
+    with _lock:
+        package = _pinned.get(checksum)
+        if package is None:
+            package = _cached.get(checksum)
+            if package is not None:
+                _cached.move_to_end(checksum)
+        if package is not None:
+            return package
+
+    with db_session:
+        row = GameDataPackage.get(checksum=checksum)
+        if row is None:
+            return None
+        package = DecodedDataPackage.from_game_package(restricted_loads(row.data))
+
+    with _lock:
+        # another thread may have loaded it in the meantime, keep the first so its tables are shared
+        package = _cached.setdefault(checksum, package)
+        _cached.move_to_end(checksum)
+        while len(_cached) > max_cached_data_packages:
+            _cached.popitem(last=False)
+    return package
@@ -9,6 +9,7 @@ from pony.orm import count, commit, db_session
 from worlds.AutoWorld import AutoWorldRegister
 from . import app, cache
 from .models import Seed, Room, Command, UUID, uuid4
+from .notifications import notify_room
 
 
 def get_world_theme(game_name: str):
@@ -143,6 +144,7 @@ def host_room(room: UUID):
             if cmd:
                 Command(room=room, commandtext=cmd)
                 commit()
+                notify_room(app.config, room.id)
         return redirect(url_for("host_room", room=room.id))
 
     now = datetime.datetime.utcnow()
@@ -150,6 +152,8 @@ def host_room(room: UUID):
     should_refresh = not room.last_port and now - room.creation_time < datetime.timedelta(seconds=3)
     with db_session:
         room.last_activity = now  # will trigger a spinup, if it's not already running
+    commit()  # the room launcher reads the activity as soon as it is notified
+    notify_room(app.config, room.id)
 
     def get_log(max_size: int = 1024000) -> str:
         try:
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Any, Dict
 from uuid import UUID, uuid4
 from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
 
@@ -26,12 +27,24 @@ class Room(db.Entity):
     commands = Set('Command')
     seed = Required('Seed', index=True)
     multisave = Optional(buffer, lazy=True)
+    save_deltas = Set('SaveDelta')  # changes journaled since multisave was written
     show_spoiler = Required(int, default=0)  # 0 -> never, 1 -> after completion, -> 2 always
     timeout = Required(int, default=lambda: 2 * 60 * 60)  # seconds since last activity to shutdown
     tracker = Optional(UUID, index=True)
     # Port special value -1 means the server errored out. Another attempt can be made with a page refresh
     last_port = Optional(int, default=lambda: 0)
 
+    def get_multisave(self) -> Dict[str, Any]:
+        """Loads multisave with its journaled save deltas applied, empty if the room was never saved."""
+        from MultiServer import Context
+        from Utils import restricted_loads
+        if not self.multisave:
+            return {}
+        multisave = restricted_loads(self.multisave)
+        for save_delta in sorted(self.save_deltas, key=lambda save_delta: save_delta.id):
+            Context.apply_save_delta(multisave, restricted_loads(save_delta.data))
+        return multisave
+
 
 class Seed(db.Entity):
     id = PrimaryKey(UUID, default=uuid4)
@@ -50,6 +63,12 @@ class Command(db.Entity):
     commandtext = Required(str)
 
 
+class SaveDelta(db.Entity):
+    id = PrimaryKey(int, auto=True)
+    room = Required(Room)
+    data = Required(bytes)
+
+
 class Generation(db.Entity):
     id = PrimaryKey(UUID, default=uuid4)
     owner = Required(UUID)
@@ -0,0 +1,67 @@
+"""
+Local notifications from web processes to the autohost, which starts the room or wakes its command listener right away,
+instead of at the next database poll. Notifications are best effort, polling the database stays as fallback.
+"""
+from __future__ import annotations
+
+import logging
+import select
+import socket
+import typing
+from uuid import UUID
+
+address = "127.0.0.1"
+
+
+def notify_room(config: typing.Dict[str, typing.Any], room_id: UUID) -> None:
+    """Notify the autohost of new activity or commands of a room."""
+    port = config["ROOM_NOTIFICATION_PORT"]
+    if not port:
+        return
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(room_id.bytes, (address, port))
+    except OSError as e:
+        logging.debug(f"Could not notify autohost of room {room_id}: {e}")
+
+
+class RoomNotificationListener:
+    socket: socket.socket
+
+    def __init__(self, port: int):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.socket.bind((address, port))
+        except OSError:
+            self.socket.close()
+            raise
+        self.socket.setblocking(False)
+
+    @classmethod
+    def create(cls, config: typing.Dict[str, typing.Any]) -> typing.Optional[RoomNotificationListener]:
+        """Returns a listener on the configured port, or None if notifications are disabled or the port is in use."""
+        port = config["ROOM_NOTIFICATION_PORT"]
+        if not port:
+            return None
+        try:
+            return cls(port)
+        except OSError as e:
+            logging.warning(f"Could not listen for room notifications on port {port}, "
+                            f"falling back to polling the database: {e}")
+            return None
+
+    def receive(self, timeout: float) -> typing.Set[UUID]:
+        """Waits up to timeout seconds for notifications and returns the rooms of all that arrived."""
+        rooms: typing.Set[UUID] = set()
+        if select.select([self.socket], [], [], timeout)[0]:
+            while True:
+                try:
+                    data = self.socket.recv(16)
+                except OSError:  # includes BlockingIOError once all arrived notifications are read
+                    break
+                if len(data) == 16:
+                    rooms.add(UUID(bytes=data))
+        return rooms
+
+    def close(self) -> None:
+        self.socket.close()
@@ -1,5 +1,6 @@
 import datetime
 import collections
+import threading
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
@@ -10,14 +11,22 @@ from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
-from Utils import restricted_loads, KeyedDefaultDict
+from Utils import KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .datapackage import NameLookup, get_data_package
+from .models import Room
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
-
-_multidata_cache = {}
+# How many seeds' multidata and rooms' multisave are kept decoded across requests.
+MULTIDATA_CACHE_SIZE = 32
+MULTISAVE_CACHE_SIZE = 256
+
+# Decoded multidata by seed and multisave by room, shared by all TrackerData, so they have to be treated as read-only.
+_multidata_cache: "collections.OrderedDict[UUID, Tuple[None, Dict[str, Any]]]" = collections.OrderedDict()
+_multisave_cache: "collections.OrderedDict[UUID, Tuple[datetime.datetime, Dict[str, Any]]]" = \
+    collections.OrderedDict()
+_decoded_cache_lock = threading.Lock()
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
 
@@ -25,6 +34,26 @@ TeamPlayer = Tuple[int, int]
 ItemMetadata = Tuple[int, int, int]
 
 
+def _get_decoded(decoded_cache: "collections.OrderedDict[UUID, Tuple[Any, Dict[str, Any]]]", key: UUID,
+                 version: Any, decode: Callable[[], Dict[str, Any]], max_size: int) -> Dict[str, Any]:
+    """Returns the decoded data cached for key if it is of the same version, otherwise decodes and caches it.
+    Evicts the least recently used data once more than max_size are cached.
+    """
+    with _decoded_cache_lock:
+        cached = decoded_cache.get(key)
+        if cached and cached[0] == version:
+            decoded_cache.move_to_end(key)
+            return cached[1]
+
+    decoded = decode()
+    with _decoded_cache_lock:
+        decoded_cache[key] = version, decoded
+        decoded_cache.move_to_end(key)
+        while len(decoded_cache) > max_size:
+            decoded_cache.popitem(last=False)
+    return decoded
+
+
 def _cache_results(func: Callable) -> Callable:
     """Stores the results of any computationally expensive methods after the initial call in TrackerData.
     If called again, returns the cached result instead, as results will not change for the lifetime of TrackerData.
@@ -56,8 +85,11 @@ class TrackerData:
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        # multidata never changes, multisave only when the room saves, which updates last_activity
+        self._multidata = _get_decoded(_multidata_cache, room.seed.id, None,
+                                       lambda: Context.decompress(room.seed.multidata), MULTIDATA_CACHE_SIZE)
+        self._multisave = _get_decoded(_multisave_cache, room.id, room.last_activity,
+                                       room.get_multisave, MULTISAVE_CACHE_SIZE)
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -71,15 +103,16 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            # shared with other trackers and rooms, so the tables must not be modified
+            data_package = get_data_package(game_package["checksum"])
+            self.item_id_to_name[game] = NameLookup(lambda code: f"Unknown Item (ID: {code})",
+                                                    data_package.item_id_to_name)
+            self.location_id_to_name[game] = NameLookup(lambda code: f"Unknown Location (ID: {code})",
+                                                        data_package.location_id_to_name)
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = data_package.data["item_name_to_id"]
+            self.location_name_to_id[game] = data_package.data["location_name_to_id"]
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
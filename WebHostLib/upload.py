@@ -4,7 +4,6 @@ import pickle
 import typing
 import uuid
 import zipfile
-import zlib
 
 from io import BytesIO
 from flask import request, flash, redirect, url_for, session, render_template, abort
@@ -14,7 +13,7 @@ from pony.orm.core import TransactionIntegrityError
 import schema
 
 import MultiServer
-from NetUtils import SlotType
+from NetUtils import SlotType, write_multidata
 from Utils import VersionException, __version__
 from worlds import GamesPackage
 from worlds.Files import AutoPatchRegister
@@ -92,8 +91,10 @@ def process_multidata(compressed_multidata, files={}):
                            game=slot_info.game))
         flush()  # commit slots
 
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
-    return slots, compressed_multidata
+    # store in the current format, so rooms get to load the packed location table
+    multidata_file = BytesIO()
+    write_multidata(multidata_file, decompressed_multidata)
+    return slots, multidata_file.getvalue()
 
 
 def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, sid=None):
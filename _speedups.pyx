@@ -11,10 +11,14 @@ This is deliberately .pyx because using a non-compiled "pure python" may be slow
 import cython
 import warnings
 from cpython cimport PyObject
+from cpython.bytearray cimport PyByteArray_AS_STRING, PyByteArray_GET_SIZE
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
-from libc.stdint cimport int64_t, uint32_t
+from libc.stdint cimport int64_t, uint32_t, uint64_t
+from libc.stdlib cimport qsort
+from libc.string cimport memcpy, memmove, memset
 from collections import defaultdict
+from json.encoder import encode_basestring
 
 cdef extern from *:
     """
@@ -64,11 +68,37 @@ cdef struct LocationEntry:
     ap_flags_t flags
 
 
+cdef struct LocationTableHeader:
+    # see NetUtils.location_table_header
+    uint32_t player_count
+    uint32_t reserved
+    uint64_t count
+
+
 cdef struct IndexEntry:
     size_t start
     size_t count
 
 
+cdef struct ItemIndexEntry:
+    # sorted by item, receiver and entry, so find_item can binary search and still return entries in order
+    ap_id_t item
+    ap_player_t receiver
+    uint32_t entry
+
+
+cdef int compare_item_index_entries(const void* a, const void* b) noexcept nogil:
+    cdef const ItemIndexEntry* x = <const ItemIndexEntry*>a
+    cdef const ItemIndexEntry* y = <const ItemIndexEntry*>b
+    if x.item != y.item:
+        return -1 if x.item < y.item else 1
+    if x.receiver != y.receiver:
+        return -1 if x.receiver < y.receiver else 1
+    if x.entry != y.entry:
+        return -1 if x.entry < y.entry else 1
+    return 0
+
+
 @cython.auto_pickle(False)
 cdef class LocationStore:
     """Compact store for locations and their items in a MultiServer"""
@@ -80,10 +110,12 @@ cdef class LocationStore:
 
     cdef Pool _mem
     cdef object _len
+    cdef object _buffer  # keeps the buffer entries points into alive, None if entries are owned by _mem
     cdef LocationEntry* entries  # 3.2MB/100k items
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef ItemIndexEntry* item_index  # 1.6MB/100k items
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -92,7 +124,9 @@ cdef class LocationStore:
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
-                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+                + sizeof(IndexEntry) * self.sender_index_size + sizeof(ItemIndexEntry) * self.entry_count
+        if self._buffer is None:
+            size += sizeof(LocationEntry) * self.entry_count
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -102,7 +136,6 @@ cdef class LocationStore:
 
     def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]]) -> None:
         self._mem = Pool()
-        cdef object key
         self._keys = []
         self._items = []
         self._proxies = []
@@ -158,6 +191,22 @@ cdef class LocationStore:
                 self.sender_index[sender].count += 1
                 i += 1
 
+        self._build_caches(max_sender, count)
+
+    cdef _build_caches(self, size_t max_sender, size_t count):
+        cdef object key
+        cdef size_t i
+
+        # build item index
+        if count > <uint32_t>(-1):
+            raise ValueError(f"Too many locations: {count}")
+        self.item_index = <ItemIndexEntry*>self._mem.alloc(count, sizeof(ItemIndexEntry))
+        for i in range(count):
+            self.item_index[i].item = self.entries[i].item
+            self.item_index[i].receiver = self.entries[i].receiver
+            self.item_index[i].entry = <uint32_t>i
+        qsort(self.item_index, count, sizeof(ItemIndexEntry), compare_item_index_entries)
+
         # build pyobject caches
         self._proxies.append(None)  # player 0
         assert self.sender_index[0].count == 0
@@ -174,7 +223,74 @@ cdef class LocationStore:
 
         self.sender_index_size = max_sender + 1
         self.entry_count = count
-        self._len = sender_count
+        self._len = max_sender
+
+    @staticmethod
+    def from_buffer(buffer: Union[bytes, memoryview], copy: bool = True) -> LocationStore:
+        """
+        Loads a packed location table, as written by NetUtils.pack_locations, without going through dicts.
+
+        Without copy, the entries are used in place and the buffer is kept alive, so a read-only mmap of a multidata
+        file can be shared by every store of that file. The entries are copied anyway if they are not aligned.
+        """
+        cdef const unsigned char[::1] view = buffer
+        cdef LocationTableHeader header
+        cdef uint32_t endianness_probe = 1
+        if (<unsigned char*>&endianness_probe)[0] != 1 or sizeof(LocationEntry) != 32:
+            raise ValueError("Location table layout does not match LocationEntry on this platform")
+        if <size_t>view.shape[0] < sizeof(LocationTableHeader):
+            raise ValueError("Location table is truncated")
+        memcpy(&header, &view[0], sizeof(LocationTableHeader))
+        if not header.player_count:
+            raise ValueError(f"Rejecting game with 0 players")
+        if header.player_count > MAX_PLAYER_ID:
+            raise ValueError(f"Invalid player count {header.player_count}")
+        if header.count > (<size_t>view.shape[0] - sizeof(LocationTableHeader)) // sizeof(LocationEntry):
+            raise ValueError("Location table is truncated")
+        if not header.count:
+            warnings.warn("Game has no locations")
+
+        cdef LocationStore self = LocationStore.__new__(LocationStore)
+        self._mem = Pool()
+        self._keys = []
+        self._items = []
+        self._proxies = []
+        cdef size_t count = header.count
+        cdef size_t max_sender = header.player_count
+        self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
+        self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
+        cdef const unsigned char* table_entries = NULL
+        if count:
+            table_entries = &view[sizeof(LocationTableHeader)]
+        if not copy and count and <size_t>table_entries % sizeof(ap_id_t) == 0:
+            # entries are never written to after this point, so pointing into read-only memory is fine
+            self.entries = <LocationEntry*>table_entries
+            self._buffer = view
+        else:
+            self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
+            if count:
+                memcpy(self.entries, table_entries, count * sizeof(LocationEntry))
+
+        # validate entries and build index, this relies on the table being sorted by sender and location
+        cdef LocationEntry* entry
+        cdef LocationEntry* previous = NULL
+        cdef size_t i
+        for i in range(count):
+            entry = self.entries + i
+            if entry.sender < 1 or entry.sender > max_sender:
+                raise ValueError(f"Invalid player id {entry.sender} for location")
+            if entry.receiver < 1 or entry.receiver > MAX_PLAYER_ID:
+                raise ValueError(f"Invalid player id {entry.receiver} for item")
+            if previous and (entry.sender < previous.sender or
+                             (entry.sender == previous.sender and entry.location <= previous.location)):
+                raise ValueError("Location table is not sorted")
+            if not previous or entry.sender != previous.sender:
+                self.sender_index[entry.sender].start = i
+            self.sender_index[entry.sender].count += 1
+            previous = entry
+
+        self._build_caches(max_sender, count)
+        return self
 
     # fake dict access
     def __len__(self) -> int:
@@ -203,35 +319,40 @@ cdef class LocationStore:
         return self._items
 
     # specialized accessors
+    cdef size_t _find_item_start(self, ap_id_t item, ap_player_t receiver) noexcept nogil:
+        # binary search for the first item index entry that is not less than (item, receiver)
+        cdef size_t l = 0
+        cdef size_t r = self.entry_count
+        cdef size_t m
+        cdef ItemIndexEntry* index_entry
+        while l < r:
+            m = (l + r) // 2
+            index_entry = self.item_index + m
+            if index_entry.item < item or (index_entry.item == item and index_entry.receiver < receiver):
+                l = m + 1
+            else:
+                r = m
+        return l
+
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
         cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef size_t i
+        cdef LocationEntry* entry
+        cdef list found = []
+        for slot in slots:
+            if slot < 1 or slot > MAX_PLAYER_ID:
+                continue  # can't receive anything
+            receiver = slot
+            i = self._find_item_start(item, receiver)
+            while i < self.entry_count and self.item_index[i].item == item and self.item_index[i].receiver == receiver:
+                found.append(self.item_index[i].entry)
+                i += 1
+        if len(slots) > 1:
+            found.sort()  # yield in entry order, same as a scan would
+        for i in found:
+            entry = self.entries + i
+            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
         cdef ap_player_t receiver = slot
@@ -343,6 +464,9 @@ cdef class PlayerLocationProxy:
                 return entry
         return NULL
 
+    def __contains__(self, key: int) -> bool:
+        return self._get(key) != NULL
+
     def __getitem__(self, key: int) -> Tuple[int, int, int]:
         cdef LocationEntry* entry = self._get(key)
         if entry:
@@ -363,3 +487,124 @@ cdef class PlayerLocationProxy:
         count = self._store.sender_index[self._player].count
         for entry in self._store.entries[start:start+count]:
             yield entry.location, (entry.item, entry.receiver, entry.flags)
+
+
+cdef class JSONEncoder:
+    """
+    Compiled NetUtils.encode. Strings, ints, bools, None, lists, tuples and dicts with str or int keys are encoded here,
+    other types by their encoder in encoders, or other_encoder if they have none.
+    """
+    cdef dict encoders
+    cdef object other_encoder
+
+    def __init__(self, encoders: Dict[type, Any], other_encoder: Any) -> None:
+        self.encoders = encoders
+        self.other_encoder = other_encoder
+
+    def encode(self, obj: Any) -> str:
+        return self._encode(obj)
+
+    cdef str _encode(self, obj):
+        cdef type obj_type = type(obj)
+        cdef list parts
+        if obj_type is str:
+            return encode_basestring(obj)
+        if obj_type is int:
+            return repr(obj)
+        if obj is None:
+            return "null"
+        if obj is True:
+            return "true"
+        if obj is False:
+            return "false"
+        if obj_type is list or obj_type is tuple:
+            return "[" + ",".join([self._encode(value) for value in obj]) + "]"
+        if obj_type is dict:
+            parts = []
+            for key, value in (<dict>obj).items():
+                if type(key) is str:
+                    parts.append(encode_basestring(key) + ":" + self._encode(value))
+                elif type(key) is int:
+                    parts.append("\"" + repr(key) + "\":" + self._encode(value))
+                else:
+                    return self.other_encoder(obj)
+            return "{" + ",".join(parts) + "}"
+        encoder = self.encoders.get(obj_type)
+        if encoder is None:
+            return self.other_encoder(obj)
+        return encoder(obj)
+
+
+cdef enum APTokenType:
+    # see worlds.Files.APTokenTypes
+    TOKEN_WRITE = 0
+    TOKEN_COPY = 1
+    TOKEN_RLE = 2
+    TOKEN_AND_8 = 3
+    TOKEN_OR_8 = 4
+    TOKEN_XOR_8 = 5
+
+
+cdef inline uint32_t read_uint32(const unsigned char* data) noexcept nogil:
+    return data[0] | (<uint32_t>data[1] << 8) | (<uint32_t>data[2] << 16) | (<uint32_t>data[3] << 24)
+
+
+def apply_tokens(bytearray rom_data, const unsigned char[::1] token_data) -> None:
+    """
+    Compiled worlds.Files._apply_tokens. Applies a token binary onto rom_data in place.
+    Writes that reach past the end of rom_data are done as slice assignment, same as the pure python implementation.
+    """
+    cdef Py_ssize_t token_size = token_data.shape[0]
+    cdef Py_ssize_t pos = 4
+    cdef Py_ssize_t rom_size, offset, size, length, value
+    cdef uint32_t token_count, i
+    cdef unsigned char token_type
+    cdef unsigned char* rom
+    cdef const unsigned char* data
+    if token_size < 4:
+        raise ValueError("Token data is truncated.")
+    token_count = read_uint32(&token_data[0])
+    for i in range(token_count):
+        if token_size - pos < 9:
+            raise ValueError("Token data is truncated.")
+        token_type = token_data[pos]
+        offset = read_uint32(&token_data[pos + 1])
+        size = read_uint32(&token_data[pos + 5])
+        pos += 9
+        if token_size - pos < size:
+            raise ValueError("Token data is truncated.")
+        data = &token_data[pos] if size else NULL
+        pos += size
+        # rom_data is not exported as buffer, so slice assignments may resize it between tokens
+        rom = <unsigned char*>PyByteArray_AS_STRING(rom_data)
+        rom_size = PyByteArray_GET_SIZE(rom_data)
+        if token_type == TOKEN_AND_8 or token_type == TOKEN_OR_8 or token_type == TOKEN_XOR_8:
+            if size < 1 or offset >= rom_size:
+                raise IndexError("Token is out of range.")
+            if token_type == TOKEN_AND_8:
+                rom[offset] &= data[0]
+            elif token_type == TOKEN_OR_8:
+                rom[offset] |= data[0]
+            else:
+                rom[offset] ^= data[0]
+        elif token_type == TOKEN_COPY or token_type == TOKEN_RLE:
+            if size != 8:
+                raise ValueError("COPY and RLE tokens need 8 bytes of arguments.")
+            length = read_uint32(data)
+            value = read_uint32(data + 4)
+            if token_type == TOKEN_COPY:
+                if offset + length <= rom_size and value + length <= rom_size:
+                    memmove(rom + offset, rom + value, length)
+                else:
+                    rom_data[offset:offset + length] = rom_data[value:value + length]
+            else:
+                if length and value > 0xFF:
+                    raise ValueError("bytes must be in range(0, 256)")
+                if offset + length <= rom_size:
+                    memset(rom + offset, value, length)
+                else:
+                    rom_data[offset:offset + length] = bytes([value]) * length if length else b""
+        elif offset + size <= rom_size:
+            memcpy(rom + offset, data, size)
+        else:
+            rom_data[offset:offset + size] = token_data[pos - size:pos]
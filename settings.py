@@ -654,6 +654,19 @@ class GeneratorOptions(Group):
         OFF = 0
         ON = 1
 
+    class ParallelStageWorkers(int):
+        """
+        Amount of threads to run generation stages that worlds declare as parallel safe with, such as set_rules.
+        0 or 1 runs all stages one world after the other.
+        """
+
+    class OutputProcesses(int):
+        """
+        Amount of processes to generate output files in for worlds that declare their output safe for it.
+        These are forked from the generator, which is only supported on Linux.
+        0 generates all output files in threads of the generator.
+        """
+
     class PanicMethod(str):
         """
         What to do if the current item placements appear unsolvable.
@@ -671,6 +684,8 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    parallel_stage_workers: ParallelStageWorkers = ParallelStageWorkers(0)
+    output_processes: OutputProcesses = OutputProcesses(0)
 
 
 class SNIOptions(Group):
@@ -5,3 +5,17 @@ if __name__ == "__main__":
     load_worlds.run_load_worlds_benchmark()
     import locations
     locations.run_locations_benchmark()
+    import collection_state
+    collection_state.run_collection_state_benchmark()
+    import find_item
+    find_item.run_find_item_benchmark()
+    import location_store
+    location_store.run_location_store_benchmark()
+    import encode
+    encode.run_encode_benchmark()
+    import location_checks
+    location_checks.run_location_checks_benchmark()
+    import import_profile
+    import_profile.run_import_profile_benchmark()
+    import apply_tokens
+    apply_tokens.run_apply_tokens_benchmark()
@@ -0,0 +1,78 @@
+def run_apply_tokens_benchmark():
+    """Compare applying 100k tokens to a 4 MB rom with the pure python implementation against _speedups."""
+    import logging
+    import gc
+    import random
+    import time
+
+    from Utils import init_logging
+    from worlds.Files import APTokenMixin, APTokenTypes, _apply_tokens, get_token_applier
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class BenchmarkRunner:
+        rom_size: int = 4 * 1024 * 1024
+        token_count: int = 100_000
+        repetitions: int = 5
+
+        def create_patch(self):
+            rng = random.Random(0)
+
+            def random_bytes(count: int) -> bytes:
+                return rng.getrandbits(8 * count).to_bytes(count, "little")
+
+            rom = random_bytes(self.rom_size)
+            tokens = APTokenMixin()
+            token_types = [APTokenTypes.WRITE] * 4 + [APTokenTypes.AND_8, APTokenTypes.OR_8, APTokenTypes.XOR_8,
+                                                      APTokenTypes.COPY, APTokenTypes.RLE]
+            for _ in range(self.token_count):
+                token_type = rng.choice(token_types)
+                offset = rng.randrange(self.rom_size - 0x100)
+                if token_type == APTokenTypes.WRITE:
+                    tokens.write_token(token_type, offset, random_bytes(rng.randrange(1, 16)))
+                elif token_type == APTokenTypes.COPY:
+                    source = rng.randrange(self.rom_size - 0x100)
+                    tokens.write_token(token_type, offset, (rng.randrange(1, 0x100), source))
+                elif token_type == APTokenTypes.RLE:
+                    tokens.write_token(token_type, offset, (rng.randrange(1, 0x100), rng.getrandbits(8)))
+                else:
+                    tokens.write_token(token_type, offset, rng.getrandbits(8))
+            return rom, tokens.get_token_binary()
+
+        def time_apply(self, apply_tokens, rom: bytes, token_data: bytes):
+            best = float("inf")
+            rom_data = bytearray(rom)
+            for _ in range(self.repetitions):
+                rom_data = bytearray(rom)
+                gc.collect()
+                start = time.perf_counter()
+                apply_tokens(rom_data, token_data)
+                best = min(best, time.perf_counter() - start)
+            return best, bytes(rom_data)
+
+        def main(self):
+            rom, token_data = self.create_patch()
+            appliers = {"pure python": _apply_tokens}
+            if get_token_applier() is not _apply_tokens:
+                appliers["_speedups"] = get_token_applier()
+            results = {}
+            expected = None
+            for name, apply_tokens in appliers.items():
+                seconds, patched = self.time_apply(apply_tokens, rom, token_data)
+                assert expected is None or patched == expected, f"{name} patched differently"
+                expected = patched
+                results[name] = seconds
+            baseline = results["pure python"]
+            logger.info(f"Applying {self.token_count} tokens ({len(token_data)} bytes) to a {self.rom_size} byte rom: "
+                        + ", ".join(f"{name} {seconds * 1000:.1f}ms ({baseline / seconds:.1f}x)"
+                                    for name, seconds in results.items()))
+
+    runner = BenchmarkRunner()
+    runner.main()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_apply_tokens_benchmark()
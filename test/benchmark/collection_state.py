@@ -0,0 +1,64 @@
+def run_collection_state_benchmark():
+    """Measure CollectionState.copy() cost as the player count grows.
+    Every player gets a reachable Menu region and some progression items, so there is per-player state to copy."""
+    import argparse
+    import logging
+    import gc
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import MultiWorld, CollectionState, Item, ItemClassification, Region
+    from worlds import AutoWorld
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class BenchmarkRunner:
+        player_counts = (1, 10, 100, 500, 1000)
+        items_per_player: int = 50
+        copy_iterations: int = 1_000
+
+        def create_multiworld(self, players: int) -> MultiWorld:
+            multiworld = MultiWorld(players)
+            multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+            multiworld.set_seed(0)
+            args = argparse.Namespace()
+            world_type = AutoWorld.AutoWorldRegister.world_types["Archipelago"]
+            for name, option in world_type.options_dataclass.type_hints.items():
+                setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+            multiworld.set_options(args)
+            multiworld.regions += [Region("Menu", player, multiworld) for player in multiworld.player_ids]
+            multiworld.state = CollectionState(multiworld)
+            for player in multiworld.player_ids:
+                for i in range(self.items_per_player):
+                    multiworld.state.collect(Item(f"Item {i}", ItemClassification.progression, None, player), True)
+                multiworld.get_region("Menu", player).can_reach(multiworld.state)
+            return multiworld
+
+        def main(self):
+            for players in self.player_counts:
+                multiworld = self.create_multiworld(players)
+                state = multiworld.state
+                item = Item("Extra Item", ItemClassification.progression, None, 1)
+                gc.collect()
+                with TimeIt(f"{self.copy_iterations} copies with {players} players", logger) as t:
+                    for _ in range(self.copy_iterations):
+                        state.copy()
+                copy_time = t.dif
+                gc.collect()
+                with TimeIt(f"{self.copy_iterations} copies and single player collects with {players} players",
+                            logger) as t:
+                    for _ in range(self.copy_iterations):
+                        state.copy().collect(item, True)
+                logger.info(f"{players} players: {copy_time / self.copy_iterations * 1_000_000:.2f} µs per copy, "
+                            f"{t.dif / self.copy_iterations * 1_000_000:.2f} µs per copy and collect.")
+
+    runner = BenchmarkRunner()
+    runner.main()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_collection_state_benchmark()
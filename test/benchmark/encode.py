@@ -0,0 +1,77 @@
+def run_encode_benchmark():
+    """Compare packets per second of NetUtils.encode against the stdlib JSONEncoder with a NamedTuple scan."""
+    import json
+    import logging
+    import gc
+    import time
+
+    from Utils import init_logging
+    from NetUtils import NetworkItem, NetworkPlayer, encode, _encode_json
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    def scan_for_typed_tuples(obj):
+        if isinstance(obj, tuple) and hasattr(obj, "_fields"):
+            data = obj._asdict()
+            data["class"] = obj.__class__.__name__
+            return data
+        if isinstance(obj, (tuple, list, set, frozenset)):
+            return tuple(scan_for_typed_tuples(o) for o in obj)
+        if isinstance(obj, dict):
+            return {key: scan_for_typed_tuples(value) for key, value in obj.items()}
+        return obj
+
+    stdlib_encode = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":")).encode
+
+    def scan_encode(obj):
+        return stdlib_encode(scan_for_typed_tuples(obj))
+
+    class BenchmarkRunner:
+        target_seconds: float = 1.0
+        items = [NetworkItem(item * 7 + 1000, item * 13, item % 50 + 1, item % 3) for item in range(2_000)]
+        packets = {
+            "ReceivedItems sync of 2000 items": [{"cmd": "ReceivedItems", "index": 0, "items": items}],
+            "ReceivedItems of 1 item": [{"cmd": "ReceivedItems", "index": 10, "items": items[:1]}],
+            "PrintJSON ItemSend": [{
+                "cmd": "PrintJSON", "type": "ItemSend", "receiving": 2, "item": items[1],
+                "data": [{"text": "1", "type": "player_id"}, {"text": " found their "},
+                         {"text": "1007", "player": 2, "flags": 1, "type": "item_id"}, {"text": " ("},
+                         {"text": "13", "player": 1, "type": "location_id"}, {"text": ")"}]
+            }],
+            "RoomUpdate of 100 checks": [{"cmd": "RoomUpdate", "checked_locations": list(range(100)),
+                                          "players": [NetworkPlayer(0, slot, f"Alias{slot}", f"Player{slot}")
+                                                      for slot in range(1, 51)]}],
+        }
+
+        def packets_per_second(self, encoder, packet) -> float:
+            count = 0
+            start = time.perf_counter()
+            while (elapsed := time.perf_counter() - start) < self.target_seconds:
+                for _ in range(10):
+                    encoder(packet)
+                count += 10
+            return count / elapsed
+
+        def main(self):
+            encoders = {"scan + JSONEncoder": scan_encode, "pure python encode": _encode_json}
+            if encode is not _encode_json:
+                encoders["_speedups encode"] = encode
+            for name, packet in self.packets.items():
+                results = {}
+                for encoder_name, encoder in encoders.items():
+                    assert encoder(packet) == scan_encode(packet), f"{encoder_name} differs for {name}"
+                    gc.collect()
+                    results[encoder_name] = self.packets_per_second(encoder, packet)
+                baseline = results["scan + JSONEncoder"]
+                logger.info(f"{name}: " + ", ".join(f"{encoder_name} {rate:.0f}/s ({rate / baseline:.2f}x)"
+                                                    for encoder_name, rate in results.items()))
+
+    runner = BenchmarkRunner()
+    runner.main()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_encode_benchmark()
@@ -0,0 +1,69 @@
+def run_find_item_benchmark():
+    """Compare item lookups through the MultiWorld item index against a scan of all locations on a 100 world seed."""
+    import argparse
+    import logging
+    import gc
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import MultiWorld, CollectionState, Item, ItemClassification, Location, Region
+    from worlds import AutoWorld
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class BenchmarkRunner:
+        players: int = 100
+        locations_per_player: int = 500
+        lookups_per_player: int = 5
+
+        def create_multiworld(self) -> MultiWorld:
+            multiworld = MultiWorld(self.players)
+            multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+            multiworld.set_seed(0)
+            args = argparse.Namespace()
+            world_type = AutoWorld.AutoWorldRegister.world_types["Archipelago"]
+            for name, option in world_type.options_dataclass.type_hints.items():
+                setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+            multiworld.set_options(args)
+            multiworld.state = CollectionState(multiworld)
+            items = [Item(f"Item {i}", ItemClassification.progression, i, player)
+                     for player in multiworld.player_ids for i in range(self.locations_per_player)]
+            multiworld.random.shuffle(items)
+            for player in multiworld.player_ids:
+                region = Region("Menu", player, multiworld)
+                multiworld.regions.append(region)
+                for i in range(self.locations_per_player):
+                    location = Location(player, f"Location {i}", i, region)
+                    region.locations.append(location)
+                    multiworld.push_item(location, items.pop(), False)
+            return multiworld
+
+        @staticmethod
+        def scan_item_locations(multiworld: MultiWorld, item: str, player: int):
+            return [location for location in multiworld.get_locations() if
+                    location.item and location.item.name == item and location.item.player == player]
+
+        def main(self):
+            multiworld = self.create_multiworld()
+            lookups = [(f"Item {i}", player)
+                       for player in multiworld.player_ids for i in range(self.lookups_per_player)]
+            gc.collect()
+            with TimeIt(f"{len(lookups)} lookups scanning all locations", logger) as scan:
+                scanned = [self.scan_item_locations(multiworld, item, player) for item, player in lookups]
+            gc.collect()
+            with TimeIt(f"{len(lookups)} lookups through find_item_locations", logger) as indexed:
+                found = [multiworld.find_item_locations(item, player) for item, player in lookups]
+            assert scanned == found, "Index returned different locations than a scan"
+            logger.info(f"Indexed lookups were {scan.dif / indexed.dif:.1f} times faster "
+                        f"on {self.players} worlds with {self.locations_per_player} locations each.")
+
+    runner = BenchmarkRunner()
+    runner.main()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_find_item_benchmark()
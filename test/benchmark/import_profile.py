@@ -0,0 +1,65 @@
+def run_import_profile_benchmark(time_budget: float = 10.0, memory_budget: float = 64.0, modules_budget: int = 250
+                                 ) -> bool:
+    """Profile importing each world in a new interpreter and report the worlds that exceed a budget.
+    Budgets are per world, in seconds, MB of peak memory and imported modules. Returns whether all worlds are within.
+    Memory is traced while importing, which makes imports slower than without profiling."""
+    import json
+    import logging
+    import subprocess
+    import sys
+
+    from Utils import init_logging, local_path
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    script = """
+import json, tracemalloc
+import ModuleUpdate
+ModuleUpdate.update_ran = True
+import BaseClasses, Options  # cache shared imports, so they are not attributed to the first world
+tracemalloc.start()
+import worlds
+print(worlds.get_import_profile())
+print(json.dumps(worlds.failed_world_loads))
+print(json.dumps({world_source.module_name: (world_source.time_taken, world_source.memory_peak / 2 ** 20,
+                                             world_source.modules_imported)
+                  for world_source in worlds.world_sources if world_source.time_taken >= 0}))
+"""
+    result = subprocess.run([sys.executable, "-c", script], cwd=local_path(), capture_output=True, text=True,
+                            check=True)
+    *report, failed_world_loads, profile = result.stdout.strip().split("\n")
+    logger.info("World import profile:\n" + "\n".join(report))
+
+    profile = json.loads(profile)
+    if not profile:
+        logger.error("No world was profiled.")
+        return False
+    failed_world_loads = json.loads(failed_world_loads)
+    if failed_world_loads:
+        logger.error(f"Worlds failed to load, so they were not profiled: {', '.join(failed_world_loads)}")
+        return False
+
+    over_budget = {
+        module_name: (seconds, memory, modules)
+        for module_name, (seconds, memory, modules) in profile.items()
+        if seconds > time_budget or memory > memory_budget or modules > modules_budget
+    }
+    for module_name, (seconds, memory, modules) in over_budget.items():
+        logger.error(f"{module_name} exceeds the import budget of {time_budget}s, {memory_budget}MB and "
+                     f"{modules_budget} modules: {seconds:.3f}s, {memory:.1f}MB, {modules} modules")
+    return not over_budget
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from path_change import change_home
+    change_home()
+    parser = argparse.ArgumentParser(description="Profile world imports and fail if a world exceeds a budget.")
+    parser.add_argument("--time_budget", type=float, default=10.0, help="Seconds each world may take to import.")
+    parser.add_argument("--memory_budget", type=float, default=64.0, help="MB each world may allocate at its peak.")
+    parser.add_argument("--modules_budget", type=int, default=250, help="Modules each world may import.")
+    args = parser.parse_args()
+    sys.exit(not run_import_profile_benchmark(args.time_budget, args.memory_budget, args.modules_budget))
@@ -0,0 +1,85 @@
+def run_location_checks_benchmark():
+    """Compare releasing a 1000 location world in one batch against one check at a time on a room with 500 clients."""
+    import asyncio
+    import logging
+    import gc
+    import random
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from MultiServer import Client, Context, register_location_checks, release_player
+    from NetUtils import LocationStore, NetworkSlot, SlotType
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+    server_logger = logging.getLogger("Benchmark.Server")
+    server_logger.setLevel(logging.WARNING)  # don't log every item send
+
+    class CountingContext(Context):
+        """Counts the frames and characters broadcast to each client instead of sending them."""
+        frames: int = 0
+        characters: int = 0
+
+        async def broadcast_send_encoded_msgs(self, endpoints, msg: str) -> bool:
+            for _ in endpoints:
+                self.frames += 1
+                self.characters += len(msg)
+            return True
+
+    class BenchmarkRunner:
+        slots: int = 100
+        clients_per_slot: int = 5
+        locations_per_slot: int = 1000
+
+        def create_context(self) -> CountingContext:
+            rng = random.Random(0)
+            ctx = CountingContext("", 0, "", "", 0, 0, False, logger=server_logger)
+            ctx.locations = LocationStore({
+                slot: {location: (rng.randrange(1000), rng.randint(1, self.slots), 0)
+                       for location in range(self.locations_per_slot)}
+                for slot in range(1, self.slots + 1)
+            })
+            ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Archipelago", SlotType.player)
+                             for slot in range(1, self.slots + 1)}
+            ctx.clients = {0: {}}
+            for slot in ctx.slot_info:
+                ctx.player_names[0, slot] = f"Player{slot}"
+                ctx.clients[0][slot] = []
+                for _ in range(self.clients_per_slot):
+                    client = Client(None, ctx)
+                    client.team, client.slot, client.items_handling, client.auth = 0, slot, 0b111, True
+                    ctx.clients[0][slot].append(client)
+            return ctx
+
+        @staticmethod
+        async def wait_for_broadcasts():
+            await asyncio.gather(*(asyncio.all_tasks() - {asyncio.current_task()}))
+
+        async def main(self):
+            releases = {
+                "one check at a time": lambda ctx: [register_location_checks(ctx, 0, 1, [location])
+                                                    for location in ctx.locations[1]],
+                "batched release": lambda ctx: release_player(ctx, 0, 1),
+            }
+            times = {}
+            for name, release in releases.items():
+                ctx = self.create_context()
+                gc.collect()
+                with TimeIt(f"Release with {name}", logger) as timer:
+                    release(ctx)
+                    await self.wait_for_broadcasts()
+                times[name] = timer.dif
+                logger.info(f"Release with {name} broadcast {ctx.frames} frames "
+                            f"and {ctx.characters} characters to {self.slots * self.clients_per_slot} clients.")
+            logger.info(f"Batched release was {times['one check at a time'] / times['batched release']:.1f} "
+                        f"times faster.")
+
+    runner = BenchmarkRunner()
+    asyncio.run(runner.main())
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_location_checks_benchmark()
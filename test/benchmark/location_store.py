@@ -0,0 +1,61 @@
+def run_location_store_benchmark():
+    """Compare LocationStore.find_item against a scan of all locations on a 1000 slot room with 100k locations."""
+    import logging
+    import gc
+    import random
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from NetUtils import LocationStore, _LocationStore
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class BenchmarkRunner:
+        players: int = 1000
+        locations_per_player: int = 100
+        item_ids: int = 500
+        hints: int = 1_000
+
+        def create_locations(self):
+            rng = random.Random(0)
+            return {
+                player: {
+                    location: (rng.randrange(self.item_ids), rng.randint(1, self.players), 0)
+                    for location in range(self.locations_per_player)
+                } for player in range(1, self.players + 1)
+            }
+
+        @staticmethod
+        def scan_find_item(store, slots, seeked_item_id):
+            return [(finding_player, location_id, item_id, receiving_player, item_flags)
+                    for finding_player, check_data in store.items()
+                    for location_id, (item_id, receiving_player, item_flags) in check_data.items()
+                    if receiving_player in slots and item_id == seeked_item_id]
+
+        def main(self):
+            rng = random.Random(1)
+            locations = self.create_locations()
+            lookups = [({rng.randint(1, self.players)}, rng.randrange(self.item_ids)) for _ in range(self.hints)]
+            for store_type in dict.fromkeys((LocationStore, _LocationStore)):
+                with TimeIt(f"Loading {store_type.__name__}", logger):
+                    store = store_type(locations)
+                gc.collect()
+                with TimeIt(f"{len(lookups)} hints scanning {store_type.__name__}", logger) as scan:
+                    scanned = [self.scan_find_item(store, slots, item) for slots, item in lookups]
+                gc.collect()
+                with TimeIt(f"{len(lookups)} hints through {store_type.__name__}.find_item", logger) as indexed:
+                    found = [list(store.find_item(slots, item)) for slots, item in lookups]
+                assert scanned == found, "find_item returned different locations than a scan"
+                logger.info(f"{store_type.__name__}.find_item was {scan.dif / indexed.dif:.1f} times faster "
+                            f"than a scan on {self.players} slots with {self.locations_per_player} locations each.")
+
+    runner = BenchmarkRunner()
+    runner.main()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_location_store_benchmark()
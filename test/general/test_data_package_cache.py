@@ -0,0 +1,102 @@
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+from typing import Dict, List, Set, Tuple
+from unittest import mock
+
+import worlds
+from worlds import GamesPackage, network_data_package
+from worlds.AutoWorld import AutoWorldRegister, World
+
+
+class TestDataPackageCache(unittest.TestCase):
+    games = ("Archipelago", "Clique")
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_path = os.path.join(temp_dir.name, "worlds.pickle")
+        patcher = mock.patch("worlds.data_package_cache_path", self.cache_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def build(self) -> Tuple[Dict[str, GamesPackage], List[str]]:
+        """Builds the data packages of the tested games, returning them and the games that were not cached."""
+        computed: List[str] = []
+        get_data_package_data = World.get_data_package_data.__func__
+
+        def counting_get_data_package_data(cls):
+            computed.append(cls.game)
+            return get_data_package_data(cls)
+
+        with mock.patch.dict(network_data_package["games"], clear=True), \
+                mock.patch.object(World, "get_data_package_data", classmethod(counting_get_data_package_data)):
+            worlds._build_data_packages({game: AutoWorldRegister.world_types[game] for game in self.games})
+            return dict(network_data_package["games"]), computed
+
+    def test_reuse(self) -> None:
+        """Tests that data packages of unchanged worlds are read from the cache and match the worlds."""
+        _, computed = self.build()
+        self.assertEqual(sorted(computed), sorted(self.games))
+        self.assertTrue(os.path.isfile(self.cache_path))
+        game_packages, computed = self.build()
+        self.assertEqual(computed, [])
+        for game in self.games:
+            with self.subTest(game=game):
+                self.assertEqual(game_packages[game], AutoWorldRegister.world_types[game].get_data_package_data())
+
+    def test_changed_source(self) -> None:
+        """Tests that data packages are rebuilt when the files of their world change."""
+        self.build()
+        with mock.patch("worlds._get_source_fingerprint", return_value=(("changed", 0, 0),)):
+            _, computed = self.build()
+        self.assertEqual(sorted(computed), sorted(self.games))
+
+    def test_changed_import(self) -> None:
+        """Tests that data packages are rebuilt when a module the world depends on from elsewhere changes."""
+        imported_file = os.path.join(os.path.dirname(self.cache_path), "imported.py")
+        with open(imported_file, "w") as f:
+            f.write("")
+        get_world_dependencies = worlds._get_world_dependencies
+
+        def clique_dependencies(world_source: worlds.WorldSource, references: Dict[str, Set[str]]) -> Tuple[str, ...]:
+            dependencies = get_world_dependencies(world_source, references)
+            return (*dependencies, imported_file) if world_source.module_name == "clique" else dependencies
+
+        with mock.patch("worlds._get_world_dependencies", clique_dependencies):
+            self.build()
+            _, computed = self.build()
+            self.assertEqual(computed, [])
+            with open(imported_file, "w") as f:
+                f.write("changed = True\n")
+            _, computed = self.build()
+        self.assertEqual(computed, ["Clique"])
+
+    def test_dependencies(self) -> None:
+        """Tests that modules a world references are dependencies, even if they were imported before the world."""
+        module_folder = os.path.dirname(self.cache_path)
+        with open(os.path.join(module_folder, "shared_test_module.py"), "w") as f:
+            f.write("")
+        sys.path.insert(0, module_folder)
+        self.addCleanup(sys.path.remove, module_folder)
+        self.addCleanup(sys.modules.pop, "shared_test_module", None)
+        shared_module = importlib.import_module("shared_test_module")
+
+        world_source = next(world_source for world_source in worlds.world_sources
+                            if world_source.module_name == "clique")
+        dependencies = worlds._get_world_dependencies(world_source, {})
+        self.assertIn(sys.modules["BaseClasses"].__file__, dependencies)
+        self.assertIn(sys.modules["worlds.AutoWorld"].__file__, dependencies)
+        self.assertNotIn(shared_module.__file__, dependencies)
+        self.assertFalse(any(path.startswith(world_source.resolved_path) for path in dependencies))
+        with mock.patch.object(sys.modules["worlds.clique.Items"], "shared", shared_module, create=True):
+            self.assertIn(shared_module.__file__, worlds._get_world_dependencies(world_source, {}))
+
+    def test_record_imports(self) -> None:
+        """Tests that import statements are recorded while worlds load, including those of imported modules."""
+        self.addCleanup(worlds._module_imports.pop, "recorded_test_module", None)
+        with worlds._record_imports():
+            exec("import json\nfrom os import path", {"__name__": "recorded_test_module"})
+        self.assertEqual(worlds._module_imports["recorded_test_module"], {"json", "os", "os.path"})
@@ -1,11 +1,15 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Iterable
 import unittest
+from unittest import mock
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
+import Fill
 from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
-from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
+    distribute_early_items, distribute_items_restrictive, swap_location_item
+from BaseClasses import CollectionState, Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
@@ -243,6 +247,50 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(locations[2].item, items[0])
         self.assertEqual(locations[3].item, items[3])
 
+    def test_incremental_pool_state(self):
+        """Test that fill keeps one pool state up to date instead of collecting the pool for every item"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 4, 4)
+        items = player1.prog_items
+        locations = player1.locations
+
+        multiworld.completion_condition[player1.id] = lambda state: state.has_all(names(items), player1.id)
+        set_rule(locations[0], lambda state: state.has(items[1].name, player1.id))
+        set_rule(locations[1], lambda state: state.has(items[2].name, player1.id))
+        set_rule(locations[2], lambda state: state.has(items[3].name, player1.id))
+
+        with mock.patch("Fill._collect_pool", wraps=Fill._collect_pool) as collect_pool:
+            fill_restrictive(multiworld, multiworld.state, locations.copy(), items.copy())
+
+        self.assertEqual(collect_pool.call_count, 1)
+        self.assertEqual(locations[0].item, items[3])
+        self.assertEqual(locations[1].item, items[0])
+        self.assertEqual(locations[2].item, items[2])
+        self.assertEqual(locations[3].item, items[1])
+
+    def test_pool_state_rebuilt(self):
+        """Test that fill collects the pool again when an item can't be removed from the pool state"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 4, 4)
+        items = player1.prog_items
+        locations = player1.locations
+
+        multiworld.completion_condition[player1.id] = lambda state: state.has_all(names(items), player1.id)
+        set_rule(locations[0], lambda state: state.has(items[1].name, player1.id))
+        set_rule(locations[1], lambda state: state.has(items[2].name, player1.id))
+        set_rule(locations[2], lambda state: state.has(items[3].name, player1.id))
+
+        with mock.patch("Fill._collect_pool", wraps=Fill._collect_pool) as collect_pool, \
+                mock.patch.object(CollectionState, "remove", return_value=False) as remove:
+            fill_restrictive(multiworld, multiworld.state, locations.copy(), items.copy())
+
+        self.assertEqual(remove.call_count, 3)
+        self.assertEqual(collect_pool.call_count, 4)
+        self.assertEqual(locations[0].item, items[3])
+        self.assertEqual(locations[1].item, items[0])
+        self.assertEqual(locations[2].item, items[2])
+        self.assertEqual(locations[3].item, items[1])
+
     def test_impossible_fill(self):
         """Test that fill raises an error when it can't place any items"""
         multiworld = generate_test_multiworld()
@@ -448,6 +496,111 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertTrue(multiworld.state.prog_items[item.player][item.name], "Sweep did not collect - Test flawed")
         self.assertEqual(multiworld.state.prog_items[item.player][item.name], 1, "Sweep collected multiple times")
 
+    def test_chained_sweep(self):
+        """Test that sweep follows item chains across players and only checks locations in reachable regions"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 1, 1)
+        player2 = generate_player_data(multiworld, 2, 1, 1)
+        item1 = player1.prog_items[0]
+        item2 = player2.prog_items[0]
+        region1 = player1.generate_region(player1.menu, 1, lambda state: state.has(item1.name, 1))
+        rule_calls = []
+
+        def rule(state) -> bool:
+            rule_calls.append(state)
+            return True
+
+        gated_location = region1.locations[0]
+        gated_location.access_rule = rule
+        gated_item = Item("gated_event", ItemClassification.progression, None, 1)
+        gated_location.place_locked_item(gated_item)
+        # player 2's location unlocks player 1's region, which in turn unlocks player 1's item for player 2
+        player2.locations[0].place_locked_item(item1)
+        player1.locations[0].access_rule = lambda state: state.has(gated_item.name, 1)
+        player1.locations[0].place_locked_item(item2)
+
+        multiworld.state.sweep_for_events()
+        self.assertTrue(multiworld.state.has(gated_item.name, 1))
+        self.assertTrue(multiworld.state.has(item2.name, 2))
+        self.assertEqual(len(rule_calls), 1, "Access rule evaluated before its region was reachable")
+
+        # an access rule on another player's item makes the location reachable without changing its player's state
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 1, 1)
+        player2 = generate_player_data(multiworld, 2, 1, 1)
+        player2.locations[0].place_locked_item(player2.prog_items[0])
+        player1.locations[0].access_rule = lambda state: state.has(player2.prog_items[0].name, 2)
+        player1.locations[0].place_locked_item(player1.prog_items[0])
+
+        multiworld.state.sweep_for_events()
+        self.assertTrue(multiworld.state.has(player1.prog_items[0].name, 1))
+
+    def test_sphere_cache(self):
+        """Test that the cached spheres are shared and recomputed after items got placed or swapped"""
+        multiworld = generate_test_multiworld(1)
+        player1 = generate_player_data(multiworld, 1, 1, 2)
+        item1, item2 = player1.prog_items
+        region1 = player1.generate_region(player1.menu, 1, lambda state: state.has(item1.name, 1))
+        location1 = player1.locations[0]
+        location2 = region1.locations[0]
+        multiworld.completion_condition[1] = lambda state: state.has_all((item1.name, item2.name), 1)
+        multiworld.push_item(location1, item1, False)
+        self.assertEqual(list(multiworld.get_spheres()), [{location1}])
+        self.assertFalse(multiworld.can_beat_game())
+
+        multiworld.push_item(location2, item2, False)
+        cache = multiworld.get_sphere_cache()
+        self.assertEqual(list(multiworld.get_spheres()), [{location1}, {location2}])
+        self.assertTrue(multiworld.can_beat_game())
+        self.assertTrue(multiworld.fulfills_accessibility())
+        self.assertIs(multiworld.get_sphere_cache(), cache, "Spheres were not shared between consumers")
+
+        swap_location_item(location1, location2)
+        self.assertEqual(list(multiworld.get_spheres()), [{location1}, set(), {location2}])
+        self.assertFalse(multiworld.can_beat_game())
+        self.assertFalse(multiworld.fulfills_accessibility())
+
+    def test_sphere_cache_threads(self):
+        """Test that consumers running in parallel share one computation of the spheres"""
+        multiworld = generate_test_multiworld(1)
+        player1 = generate_player_data(multiworld, 1, 2, 2)
+        multiworld.push_item(player1.locations[0], player1.prog_items[0], False)
+        multiworld.completion_condition[1] = lambda state: state.has(player1.prog_items[0].name, 1)
+        self.assertTrue(multiworld.can_beat_game())
+        self.assertIsNone(multiworld._sphere_cache, "can_beat_game computed all spheres")
+
+        compute_spheres = multiworld._compute_spheres
+        computations = []
+
+        def slow_compute_spheres():
+            computations.append(None)
+            time.sleep(0.05)
+            return compute_spheres()
+
+        multiworld._compute_spheres = slow_compute_spheres
+        with ThreadPoolExecutor(2) as pool:
+            results = [pool.submit(lambda: list(multiworld.get_spheres())) for _ in range(2)]
+            for spheres in results:
+                self.assertEqual(spheres.result(), [{player1.locations[0]}])
+        self.assertEqual(len(computations), 1)
+
+    def test_accessibility_excluded(self):
+        """Test that the accessibility check doesn't collect items from excluded locations, with or without state"""
+        multiworld = generate_test_multiworld(1)
+        player1 = generate_player_data(multiworld, 1, 1, 2)
+        item1, item2 = player1.prog_items
+        region1 = player1.generate_region(player1.menu, 1, lambda state: state.has(item1.name, 1))
+        excluded_location = player1.locations[0]
+        excluded_location.progress_type = LocationProgressType.EXCLUDED
+        multiworld.completion_condition[1] = lambda state: state.has_all((item1.name, item2.name), 1)
+        multiworld.push_item(excluded_location, item1, False)
+        multiworld.push_item(region1.locations[0], item2, False)
+
+        self.assertTrue(multiworld.can_beat_game())
+        self.assertEqual(list(multiworld.get_spheres()), [{excluded_location}, {region1.locations[0]}])
+        self.assertFalse(multiworld.fulfills_accessibility())
+        self.assertFalse(multiworld.fulfills_accessibility(CollectionState(multiworld)))
+
     def test_correct_item_instance_removed_from_pool(self):
         """Test that a placed item gets removed from the submitted pool"""
         multiworld = generate_test_multiworld()
@@ -1,5 +1,6 @@
 import unittest
 from collections import Counter
+from BaseClasses import Item, ItemClassification
 from worlds.AutoWorld import AutoWorldRegister, call_all
 from . import setup_solo_multiworld
 
@@ -66,3 +67,25 @@ class TestBase(unittest.TestCase):
                         for location in locations:
                             self.assertIn(location, world_type.location_name_to_id)
                         self.assertNotIn(group_name, world_type.location_name_to_id)
+
+    def test_fill_status_index(self):
+        """Test that the fill status and item indexes match the locations' items, in location order."""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game_name=game_name):
+                multiworld = setup_solo_multiworld(world_type)
+                locations = list(multiworld.get_locations())
+                self.assertEqual(multiworld.get_filled_locations(),
+                                 [location for location in locations if location.item is not None])
+                self.assertEqual(multiworld.get_unfilled_locations(),
+                                 [location for location in locations if location.item is None])
+
+                unfilled = multiworld.get_unfilled_locations(1)
+                if unfilled:
+                    location = unfilled[0]
+                    location.item = Item("Test Item", ItemClassification.filler, None, 1)
+                    self.assertIn(location, multiworld.get_filled_locations(1))
+                    self.assertNotIn(location, multiworld.get_unfilled_locations(1))
+                    self.assertIs(multiworld.find_item("Test Item", 1), location)
+                    location.item = None
+                    self.assertEqual(multiworld.get_unfilled_locations(1), unfilled)
+                    self.assertEqual(multiworld.find_item_locations("Test Item", 1), [])
@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from Fill import distribute_items_restrictive
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from . import gen_steps, generate_test_multiworld, setup_multiworld
+
+
+class TestParallelStages(unittest.TestCase):
+    def test_parallel_safe_stage(self) -> None:
+        """Tests that declared parallel safe stages run in worker threads and undeclared ones in player order"""
+        multiworld = generate_test_multiworld(3)
+        multiworld.parallel_stage_workers = 2
+        threads = {}
+        order = []
+
+        for player, world in multiworld.worlds.items():
+            def stage(player=player) -> None:
+                threads[player] = threading.current_thread()
+                order.append(player)
+            world.set_rules = stage
+            world.generate_basic = stage
+            if player != 3:
+                world.parallel_safe_stages = frozenset({"set_rules"})
+
+        call_all(multiworld, "set_rules")
+        self.assertIsNot(threads[1], threading.current_thread())
+        self.assertIsNot(threads[2], threading.current_thread())
+        self.assertIs(threads[3], threading.current_thread())
+
+        order.clear()
+        call_all(multiworld, "generate_basic")
+        self.assertEqual(order, [1, 2, 3])
+        self.assertTrue(all(thread is threading.current_thread() for thread in threads.values()))
+
+    def test_parallel_stage_random(self) -> None:
+        """Tests that the global random can't be used in parallel stages and is restored afterwards"""
+        multiworld = generate_test_multiworld(2)
+        multiworld.parallel_stage_workers = 2
+        for world in multiworld.worlds.values():
+            world.parallel_safe_stages = frozenset({"set_rules"})
+            world.set_rules = lambda: multiworld.random.random()
+
+        with self.assertRaises(RuntimeError):
+            call_all(multiworld, "set_rules")
+        multiworld.random.random()
+
+    def test_opted_in_world(self) -> None:
+        """Tests that a world declaring parallel safe stages generates the same seed with and without workers"""
+        world_type = AutoWorldRegister.world_types["Clique"]
+        self.assertTrue(world_type.parallel_safe_stages)
+        results = []
+        for workers in (0, 4):
+            multiworld = setup_multiworld([world_type] * 4, (), seed=1)
+            multiworld.parallel_stage_workers = workers
+            for step in gen_steps:
+                call_all(multiworld, step)
+            distribute_items_restrictive(multiworld)
+            results.append([(location.player, location.name, location.item.player, location.item.name)
+                            for location in multiworld.get_filled_locations()])
+        self.assertEqual(results[0], results[1])
@@ -0,0 +1,83 @@
+# Tests for _speedups.apply_tokens and worlds.Files._apply_tokens
+import os
+import random
+import unittest
+from typing import Callable, ClassVar
+
+from NetUtils import LocationStore, _LocationStore
+from worlds.Files import APTokenMixin, APTokenTypes, _apply_tokens, get_token_applier
+
+ci = bool(os.environ.get("CI"))  # always set in GitHub actions
+
+
+class Base:
+    class TestApplyTokens(unittest.TestCase):
+        apply_tokens: ClassVar[Callable[[bytearray, bytes], None]]
+
+        def apply(self, rom: bytes, tokens: APTokenMixin) -> bytes:
+            rom_data = bytearray(rom)
+            self.apply_tokens(rom_data, tokens.get_token_binary())
+            return bytes(rom_data)
+
+        def test_token_types(self) -> None:
+            tokens = APTokenMixin()
+            tokens.write_token(APTokenTypes.WRITE, 1, b"\x11\x22")
+            tokens.write_token(APTokenTypes.AND_8, 4, 0x0F)
+            tokens.write_token(APTokenTypes.OR_8, 5, 0xF0)
+            tokens.write_token(APTokenTypes.XOR_8, 6, 0xFF)
+            tokens.write_token(APTokenTypes.RLE, 8, (3, 0xAA))
+            tokens.write_token(APTokenTypes.COPY, 12, (3, 1))
+            tokens.write_token(APTokenTypes.COPY, 9, (4, 8))  # overlapping copy reads before writing
+            rom = bytes(range(0x30, 0x40))
+            self.assertEqual(self.apply(rom, tokens),
+                             b"\x30\x11\x22\x33\x04\xf5\xc9\x37\xaa\xaa\xaa\xaa\x3b\x22\x33\x3f")
+
+        def test_past_end(self) -> None:
+            """Tests that tokens reaching past the end of the rom extend it like slice assignment."""
+            rom = bytes(range(1, 9))
+            for token_type, args, expected in (
+                (APTokenTypes.WRITE, b"\xff\xfe\xfd", rom[:6] + b"\xff\xfe\xfd"),
+                (APTokenTypes.RLE, (4, 0xff), rom[:6] + b"\xff" * 4),
+                (APTokenTypes.COPY, (4, 0), rom[:6] + rom[:4]),
+            ):
+                with self.subTest(token_type=token_type.name):
+                    tokens = APTokenMixin()
+                    tokens.write_token(token_type, 6, args)
+                    self.assertEqual(self.apply(rom, tokens), expected)
+            tokens = APTokenMixin()
+            tokens.write_token(APTokenTypes.XOR_8, 8, 1)
+            with self.assertRaises(IndexError):
+                self.apply(rom, tokens)
+
+        def test_random(self) -> None:
+            """Tests random tokens against the pure python implementation."""
+            rng = random.Random(0)
+            rom = bytes(rng.getrandbits(8) for _ in range(0x1000))
+            tokens = APTokenMixin()
+            for _ in range(1000):
+                token_type = rng.choice(list(APTokenTypes))
+                offset = rng.randrange(0x1000 - 0x20)
+                if token_type == APTokenTypes.WRITE:
+                    tokens.write_token(token_type, offset, bytes(rng.getrandbits(8) for _ in range(rng.randrange(20))))
+                elif token_type == APTokenTypes.COPY:
+                    tokens.write_token(token_type, offset, (rng.randrange(20), rng.randrange(0x1000 - 0x20)))
+                elif token_type == APTokenTypes.RLE:
+                    tokens.write_token(token_type, offset, (rng.randrange(20), rng.getrandbits(8)))
+                else:
+                    tokens.write_token(token_type, offset, rng.getrandbits(8))
+            expected = bytearray(rom)
+            _apply_tokens(expected, tokens.get_token_binary())
+            self.assertNotEqual(bytes(expected), rom)
+            self.assertEqual(self.apply(rom, tokens), bytes(expected))
+
+
+class TestPurePythonApplyTokens(Base.TestApplyTokens):
+    apply_tokens = staticmethod(_apply_tokens)
+
+
+@unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
+class TestSpeedupsApplyTokens(Base.TestApplyTokens):
+    apply_tokens = staticmethod(get_token_applier())
+
+    def test_compiled(self) -> None:
+        self.assertIsNot(self.apply_tokens, _apply_tokens, "Failed to load _speedups.apply_tokens")
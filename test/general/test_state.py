@@ -0,0 +1,26 @@
+import unittest
+
+from BaseClasses import Item, ItemClassification
+from . import generate_test_multiworld
+
+
+class TestCollectionState(unittest.TestCase):
+    def test_copy_is_independent(self) -> None:
+        """Tests that a state copy and its source don't see each other's changes to shared per-player data"""
+        multiworld = generate_test_multiworld(2)
+        state = multiworld.state
+        item = Item("Test Item", ItemClassification.progression, None, 1)
+        state.collect(item, True)
+        self.assertTrue(multiworld.get_region("Menu", 1).can_reach(state))
+
+        copied = state.copy()
+        copy_of_copy = copied.copy()
+        copied.collect(item, True)
+        state.remove(item)
+
+        self.assertEqual(state.count(item.name, 1), 0)
+        self.assertEqual(copied.count(item.name, 1), 2)
+        self.assertEqual(copy_of_copy.count(item.name, 1), 1)
+        self.assertEqual(set(copied.prog_items), {1, 2})
+        self.assertFalse(state.reachable_regions[1])
+        self.assertTrue(copy_of_copy.reachable_regions[1])
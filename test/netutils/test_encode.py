@@ -0,0 +1,124 @@
+# Tests for NetUtils.encode and _speedups.JSONEncoder
+import asyncio
+import enum
+import json
+import os
+import typing
+import unittest
+
+from websockets import Headers
+
+from NetUtils import ClientStatus, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, decode, encode, _encode_json, \
+    LocationStore, _LocationStore, Endpoint, compressed_subprotocol, compression_threshold, decode_frame, encode_frame, \
+    skip_deflate
+
+ci = bool(os.environ.get("CI"))  # always set in GitHub actions
+
+
+class Point(typing.NamedTuple):
+    x: int
+    y: float
+
+
+class Color(str, enum.Enum):
+    red = "red"
+
+
+def reference_encode(obj: typing.Any) -> str:
+    """The stdlib JSONEncoder with NamedTuples turned into dicts beforehand, as encode used to work."""
+    def scan(o: typing.Any) -> typing.Any:
+        if isinstance(o, tuple) and hasattr(o, "_fields"):
+            data = {key: scan(value) for key, value in o._asdict().items()}
+            data["class"] = o.__class__.__name__
+            return data
+        if isinstance(o, (tuple, list, set, frozenset)):
+            return tuple(scan(value) for value in o)
+        if isinstance(o, dict):
+            return {key: scan(value) for key, value in o.items()}
+        return o
+
+    return json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":")).encode(scan(obj))
+
+
+samples: typing.List[typing.Any] = [
+    [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 4), NetworkItem(5, 6, 7)]}],
+    [{"cmd": "PrintJSON", "type": "ItemSend", "receiving": 2, "item": NetworkItem(1, -2, 3, 1),
+      "data": [{"text": "Ünïcödé \"quoted\"\n", "type": "player_id"}, {"text": "☃", "player": 1, "flags": 0}]}],
+    [{"cmd": "Connected", "slot": 1, "players": [NetworkPlayer(0, 1, "alias", "name")], "missing_locations": {1, 2},
+      "checked_locations": frozenset(), "slot_data": {1: None, 2.5: True, False: [], None: 1.5, True: "x"},
+      "slot_info": {1: NetworkSlot("name", "game", SlotType.player), 2: NetworkSlot("g", "game", SlotType.group, [1])},
+      "hint_points": 2 ** 70, "status": ClientStatus.CLIENT_GOAL, "color": Color.red}],
+    [float("nan"), float("inf"), -float("inf"), 0.1, -0.0, (), [], {}, "", Point(1, 2.5), [Point(-1, 0.0)]],
+    [NetworkItem(True, 1.5, "player", None)],
+]
+
+
+class Base:
+    class TestEncode(unittest.TestCase):
+        encode: typing.Callable[[typing.Any], str]
+
+        def test_matches_reference(self) -> None:
+            for sample in samples:
+                with self.subTest(sample=sample):
+                    self.assertEqual(self.encode(sample), reference_encode(sample))
+
+        def test_round_trip(self) -> None:
+            items = [NetworkItem(1, 2, 3, 4), NetworkPlayer(0, 1, "alias", "name")]
+            self.assertEqual(decode(self.encode(items)), items)
+
+        def test_not_serializable(self) -> None:
+            with self.assertRaises(TypeError):
+                self.encode([object()])
+            with self.assertRaises(TypeError):
+                self.encode({(1, 2): 3})
+
+
+class TestPurePythonEncode(Base.TestEncode):
+    """Run encode tests for pure python implementation."""
+    encode = staticmethod(_encode_json)
+
+
+@unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
+class TestSpeedupsEncode(Base.TestEncode):
+    """Run encode tests for cython implementation."""
+    encode = staticmethod(encode)
+
+    def setUp(self) -> None:
+        self.assertIsNot(encode, _encode_json, "Failed to load _speedups.JSONEncoder")
+
+
+class TestFrames(unittest.TestCase):
+    def test_compressed(self) -> None:
+        msg = encode([{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3)] * 1000}])
+        frame = encode_frame(msg, True)
+        self.assertIsInstance(frame, bytes)
+        self.assertLess(len(frame), len(msg))
+        self.assertEqual(decode_frame(frame), decode(msg))
+
+    def test_text(self) -> None:
+        small_msg = encode([{"cmd": "Bounced", "data": "x" * (compression_threshold // 2)}])
+        self.assertIs(encode_frame(small_msg, True), small_msg)
+        msg = encode([{"cmd": "Bounced", "data": "x" * compression_threshold}])
+        self.assertIs(encode_frame(msg, False), msg)
+        self.assertEqual(decode_frame(msg), decode(msg))
+
+    def test_negotiated(self) -> None:
+        class Socket:
+            def __init__(self, subprotocol: typing.Optional[str]) -> None:
+                self.subprotocol = subprotocol
+
+        self.assertTrue(Endpoint(Socket(compressed_subprotocol)).compressed)
+        self.assertFalse(Endpoint(Socket(None)).compressed)
+        self.assertFalse(Endpoint(None).compressed)
+
+    def test_skip_deflate(self) -> None:
+        deflate = "permessage-deflate; client_max_window_bits"
+        headers = Headers({"Sec-WebSocket-Protocol": f"other, {compressed_subprotocol}",
+                           "Sec-WebSocket-Extensions": deflate})
+        asyncio.run(skip_deflate("/", headers))
+        self.assertNotIn("Sec-WebSocket-Extensions", headers)
+        headers = Headers({"Sec-WebSocket-Protocol": compressed_subprotocol})
+        asyncio.run(skip_deflate("/", headers))
+        headers = Headers({"Sec-WebSocket-Extensions": deflate})
+        asyncio.run(skip_deflate("/", headers))
+        self.assertEqual(headers["Sec-WebSocket-Extensions"], deflate)
@@ -3,7 +3,7 @@ import os
 import typing
 import unittest
 import warnings
-from NetUtils import LocationStore, _LocationStore
+from NetUtils import LocationStore, _LocationStore, pack_locations
 
 State = typing.Dict[typing.Tuple[int, int], typing.Set[int]]
 RawLocations = typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
@@ -208,6 +208,13 @@ class TestPurePythonLocationStore(Base.TestLocationStore):
         super().setUp()
 
 
+class TestPurePythonPackedLocationStore(Base.TestLocationStore):
+    """Run base method tests for pure python implementation loaded from a packed location table."""
+    def setUp(self) -> None:
+        self.store = _LocationStore.from_buffer(b"".join(pack_locations(sample_data)))
+        super().setUp()
+
+
 class TestPurePythonLocationStoreConstructor(Base.TestLocationStoreConstructor):
     """Run base constructor tests for the pure python implementation."""
     def setUp(self) -> None:
@@ -224,6 +231,33 @@ class TestSpeedupsLocationStore(Base.TestLocationStore):
         super().setUp()
 
 
+@unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
+class TestSpeedupsPackedLocationStore(Base.TestLocationStore):
+    """Run base method tests for cython implementation loaded from a packed location table."""
+    def setUp(self) -> None:
+        self.assertFalse(LocationStore is _LocationStore, "Failed to load _speedups")
+        self.store = LocationStore.from_buffer(b"".join(pack_locations(sample_data)))
+        super().setUp()
+
+    def test_invalid_table(self) -> None:
+        table = b"".join(pack_locations(sample_data))
+        with self.assertRaises(ValueError):
+            LocationStore.from_buffer(table[:-1])
+        unsorted_table = table[:16] + table[48:80] + table[16:48] + table[80:]
+        with self.assertRaises(ValueError):
+            LocationStore.from_buffer(unsorted_table)
+
+    def test_in_place(self) -> None:
+        table = b"".join(pack_locations(sample_data))
+        store = LocationStore.from_buffer(table, copy=False)
+        self.assertEqual({player: dict(locations.items()) for player, locations in store.items()}, sample_data)
+        self.assertLess(store.get_size(), self.store.get_size(), "Entries were copied")
+
+    def test_repack(self) -> None:
+        table = b"".join(pack_locations(sample_data))
+        self.assertEqual(b"".join(pack_locations(self.store)), table)
+
+
 @unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
 class TestSpeedupsLocationStoreConstructor(Base.TestLocationStoreConstructor):
     """Run base constructor tests and tests the additional constraints for cython implementation."""
@@ -4,12 +4,15 @@ import unittest
 import os
 import os.path
 import sys
+import zipfile
 
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 import Generate
 import Main
+import Utils
 
 
 class TestGenerateMain(unittest.TestCase):
@@ -92,3 +95,65 @@ class TestGenerateMain(unittest.TestCase):
             user_path.cached_path = user_path_backup
 
         self.assertOutput(self.output_tempdir.name)
+
+    @unittest.skipUnless(Utils.is_linux, "output processes are only supported on Linux")
+    def test_generate_output_processes(self):
+        from settings import get_settings
+        from worlds.timespinner import TimespinnerWorld
+
+        def generate_output(world, output_directory: str) -> None:
+            with open(os.path.join(output_directory, f"{os.getpid()}.pid"), "w"):
+                pass
+
+        settings = get_settings()
+        output_processes = settings.generator.output_processes
+        settings.generator.output_processes = 1
+        try:
+            with mock.patch.object(TimespinnerWorld, "generate_output", generate_output), \
+                    mock.patch.object(TimespinnerWorld, "output_process_safe", True):
+                sys.argv = [sys.argv[0], '--seed', '0',
+                            '--player_files_path', str(self.abs_input_dir),
+                            '--outputpath', self.output_tempdir.name]
+                Main.main(*Generate.main())
+        finally:
+            settings.generator.output_processes = output_processes
+
+        self.assertOutput(self.output_tempdir.name)
+        with zipfile.ZipFile(next(Path(self.output_tempdir.name).glob("*.zip"))) as zf:
+            pid_files = [name for name in zf.namelist() if name.endswith(".pid")]
+        self.assertEqual(len(pid_files), 1)
+        self.assertNotEqual(pid_files[0], f"{os.getpid()}.pid", "output was not generated in a separate process")
+
+
+class TestGetGames(unittest.TestCase):
+    """This tests resolving the games of player files before loading worlds"""
+
+    def test_games(self):
+        weights = [
+            {"game": "Clique"},
+            {"game": {"A Link to the Past": 1, "Timespinner": 0, "Factorio": 3}},
+            {"game": ["Minecraft"], "triggers": [{"option_category": "Minecraft", "option_name": "goal",
+                                                  "option_result": "a", "options": {"Minecraft": {"goal": "b"}}}]},
+        ]
+        self.assertEqual(Generate.get_games(weights), {"Clique", "A Link to the Past", "Factorio", "Minecraft"})
+
+    def test_unknown_games(self):
+        self.assertIsNone(Generate.get_games([{"name": "Player"}]))
+        for options_type in ("triggers", "linked_options"):
+            with self.subTest(options_type=options_type):
+                weights = {"game": "Clique", options_type: [{"name": "x", "percentage": 50, "option_category": None,
+                                                            "options": {None: {"+game": {"Factorio": 1}}}}]}
+                self.assertIsNone(Generate.get_games([weights]))
+
+    def test_load_worlds(self):
+        import json
+        import subprocess
+
+        import worlds  # makes sure the games of all worlds are known
+
+        script = "import os; from worlds.AutoWorld import AutoWorldRegister; " \
+                 "print(sorted(AutoWorldRegister.world_types)); print('ARCHIPELAGO_GAMES' in os.environ)"
+        env = {**os.environ, "ARCHIPELAGO_GAMES": json.dumps(["Clique"])}
+        output = subprocess.run([sys.executable, "-c", script], env=env, cwd=Path(Generate.__file__).parent,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.splitlines(), [str(["Archipelago", "Clique"]), "False"])
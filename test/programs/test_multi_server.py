@@ -1,5 +1,6 @@
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from MultiServer import Client, Context, ServerCommandProcessor, send_items_to, send_new_items
+from NetUtils import NetworkItem
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +39,158 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestSaveJournal(unittest.TestCase):
+    def test_journal_round_trip(self) -> None:
+        """Tests that saves journaled after a full save load back to the state they were taken from"""
+        import os
+        import tempfile
+        from NetUtils import Hint
+
+        with tempfile.TemporaryDirectory() as directory:
+            ctx = Context("", 0, "", "", 0, 0, False)
+            ctx.save_filename = os.path.join(directory, "test.apsave")
+            ctx.received_items[0, 1, True] = [NetworkItem(1, 2, 2, 0)]
+            ctx.location_checks[0, 2] = {2}
+            ctx.name_aliases[0, 1] = "Alias"
+            ctx.stored_data["key"] = [1]
+            self.assertTrue(ctx._save())
+            full_size = os.path.getsize(ctx.save_filename)
+
+            send_items_to(ctx, 0, 1, NetworkItem(3, 4, 2, 0))
+            send_items_to(ctx, 0, 2, NetworkItem(5, 6, 1, 0))
+            ctx.location_checks[0, 2] |= {4}
+            ctx.location_checks[0, 1] = {6}
+            ctx.save_changes["location_checks"].update(((0, 1), (0, 2)))
+            ctx.hints[0, 1].add(Hint(1, 2, 10, 20, False))
+            ctx.save_changes["hints"].add((0, 1))
+            ctx.hints_used[0, 1] += 1
+            ctx.save_changes["hints_used"].add((0, 1))
+            del ctx.name_aliases[0, 1]
+            ctx.save_changes["name_aliases"].add((0, 1))
+            ctx.stored_data["key"].append(2)
+            ctx.save_changes["stored_data"].add("key")
+            ctx.random.random()
+            self.assertEqual(ctx.get_save_delta(ctx.save_changes)["update"].keys(),
+                             {"hints", "hints_used", "name_aliases", "stored_data"},
+                             "only the marked keys of dict fields should be in the delta")
+            self.assertTrue(ctx._save())
+            self.assertEqual(os.path.getsize(ctx.save_filename), full_size, "save was not journaled")
+            self.assertTrue(os.path.getsize(ctx.journal_filename))
+
+            self.assertEqual(ctx.read_save(), ctx.get_save())
+
+            # a full save discards the journal, records of an older journal left behind are ignored
+            with open(ctx.journal_filename, "rb") as f:
+                journal = f.read()
+            self.assertTrue(ctx._save(True))
+            with open(ctx.journal_filename, "wb") as f:
+                f.write(journal)
+            ctx.location_checks[0, 1] |= {8}
+            ctx.save_changes["location_checks"].add((0, 1))
+            self.assertTrue(ctx._save())
+            with open(ctx.journal_filename, "ab") as f:
+                f.write(journal[:5])  # a record cut off by a crash
+
+            self.assertEqual(ctx.read_save(), ctx.get_save())
+
+
+class TestSendNewItems(unittest.TestCase):
+    def test_shared_messages(self) -> None:
+        """Tests that clients of a slot at the same point of the same items share a message, and only changed slots
+        are sent anything"""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.clients = {0: {1: [], 2: []}}
+        sent = []
+        ctx.broadcast = lambda endpoints, msgs: sent.append((list(endpoints), msgs))
+        clients = []
+        for slot, items_handling in ((1, 0b111), (1, 0b111), (1, 0b001), (1, 0b000), (2, 0b111)):
+            client = Client(None, ctx)
+            client.team, client.slot, client.items_handling = 0, slot, items_handling
+            ctx.clients[0][slot].append(client)
+            clients.append(client)
+
+        send_items_to(ctx, 0, 1, NetworkItem(10, 1, 2), NetworkItem(11, -1, 1))
+        send_new_items(ctx)
+        self.assertCountEqual(sent, [
+            (clients[:2], [{"cmd": "ReceivedItems", "index": 0,
+                            "items": [NetworkItem(10, 1, 2), NetworkItem(11, -1, 1)]}]),
+            (clients[2:3], [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(10, 1, 2)]}]),
+        ])
+        self.assertEqual([client.send_index for client in clients], [2, 2, 1, 0, 0])
+
+        sent.clear()
+        send_new_items(ctx)
+        self.assertEqual(sent, [])
+
+
+class TestHintRecheck(unittest.TestCase):
+    def test_recheck_location_hints(self) -> None:
+        """Tests that checking a location marks only its hints as found, in every slot holding them"""
+        from NetUtils import Hint
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        changed = []
+        ctx.on_changed_hints = lambda team, slot: changed.append((team, slot))
+        hint = Hint(2, 1, 10, 100, False)
+        other_hint = Hint(2, 1, 11, 101, False)
+        ctx.hints[0, 1] = {hint, other_hint}
+        ctx.hints[0, 2] = {hint, other_hint}
+        ctx.recheck_hints()
+
+        ctx.location_checks[0, 1] = {10}
+        ctx.recheck_location_hints(0, 1, [10])
+        found_hint = hint._replace(found=True)
+        self.assertEqual(ctx.hints[0, 1], {found_hint, other_hint})
+        self.assertEqual(ctx.hints[0, 2], {found_hint, other_hint})
+        self.assertCountEqual(changed, [(0, 1), (0, 2)])
+
+        changed.clear()
+        ctx.recheck_location_hints(0, 1, [10])
+        self.assertEqual(changed, [])
+
+
+class TestBatchedLocationChecks(unittest.TestCase):
+    def test_batch(self) -> None:
+        """Tests that location checks of a batch are sent as one ItemSend broadcast per team, followed by the received
+        items, the room updates per slot and one hint notification per slot"""
+        from NetUtils import Hint, LocationStore, NetworkSlot, SlotType
+        from MultiServer import register_location_checks
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.locations = LocationStore({1: {10: (100, 2, 0), 11: (101, 2, 0)}, 2: {20: (200, 1, 0)}})
+        ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Test Game", SlotType.player) for slot in (1, 2)}
+        ctx.clients = {0: {1: [], 2: []}}
+        for slot in (1, 2):
+            client = Client(None, ctx)
+            client.team, client.slot, client.items_handling = 0, slot, 0b111
+            ctx.clients[0][slot].append(client)
+        hint = Hint(2, 1, 10, 100, False)
+        ctx.hints[0, 1] = {hint}
+        ctx.hints[0, 2] = {hint}
+        ctx.recheck_hints()
+        sent = []
+        ctx.broadcast_team = lambda team, msgs: sent.append(("team", team, msgs))
+        ctx.broadcast = lambda endpoints, msgs: sent.append(("slot", [client.slot for client in endpoints], msgs))
+        ctx.on_changed_hints = lambda team, slot: sent.append(("hints", team, slot))
+
+        with ctx.batched_location_checks():
+            register_location_checks(ctx, 0, 1, [10, 11])
+            register_location_checks(ctx, 0, 2, [20])
+            self.assertEqual(sent, [], "messages were sent before the batch ended")
+
+        kinds = [message[0] for message in sent]
+        self.assertEqual(kinds, ["team", "slot", "slot", "slot", "slot", "hints", "hints"])
+        team_msgs = sent[0][2]
+        self.assertEqual([msg["type"] for msg in team_msgs], ["ItemSend"] * 3)
+        self.assertEqual([msg["item"] for msg in team_msgs],
+                         [NetworkItem(100, 10, 1, 0), NetworkItem(101, 11, 1, 0), NetworkItem(200, 20, 2, 0)])
+        received_items = {slots[0]: msgs[0]["items"] for _, slots, msgs in sent[1:3]}
+        self.assertEqual([msgs[0]["cmd"] for _, _, msgs in sent[1:3]], ["ReceivedItems"] * 2)
+        self.assertEqual(received_items, {1: [NetworkItem(200, 20, 2, 0)],
+                                          2: [NetworkItem(100, 10, 1, 0), NetworkItem(101, 11, 1, 0)]})
+        self.assertEqual([(slots, [msg["cmd"] for msg in msgs]) for _, slots, msgs in sent[3:5]],
+                         [([1], ["RoomUpdate"]), ([2], ["RoomUpdate"])])
+        self.assertCountEqual(sent[5:], [("hints", 0, 1), ("hints", 0, 2)])
@@ -0,0 +1,83 @@
+import pickle
+from unittest import mock
+
+from pony.orm import db_session
+
+from . import TestBase
+
+
+class TestDataPackageCache(TestBase):
+    @staticmethod
+    def add_game_data_package(checksum: str, item_count: int = 3) -> None:
+        from WebHostLib.models import GameDataPackage
+
+        game_package = {
+            "item_name_to_id": {f"Item {item_id}": item_id for item_id in range(item_count)},
+            "location_name_to_id": {"Location": 100},
+            "item_name_groups": {"Everything": {f"Item {item_id}" for item_id in range(item_count)}},
+            "checksum": checksum,
+        }
+        with db_session:
+            GameDataPackage(checksum=checksum, data=pickle.dumps(game_package))
+
+    def test_decoded(self) -> None:
+        """Tests that data packages from the database are decoded once and shared"""
+        from WebHostLib.datapackage import get_data_package
+
+        self.add_game_data_package("decoded")
+        package = get_data_package("decoded")
+        self.assertIsNotNone(package)
+        self.assertEqual(package.item_id_to_name, {0: "Item 0", 1: "Item 1", 2: "Item 2"})
+        self.assertEqual(package.location_id_to_name, {100: "Location"})
+        self.assertEqual(package.item_name_groups, {"Everything": {"Item 0", "Item 1", "Item 2"}})
+        self.assertEqual(package.location_name_groups, {})
+        self.assertNotIn("item_name_groups", package.data)
+        self.assertIn("Everything", package.all_item_and_group_names)
+        self.assertIs(get_data_package("decoded"), package)
+        self.assertIsNone(get_data_package("missing"))
+
+    def test_eviction(self) -> None:
+        """Tests that the least recently used data packages are evicted once the cache is full"""
+        from WebHostLib.datapackage import get_data_package
+
+        for checksum in ("evict 0", "evict 1", "evict 2"):
+            self.add_game_data_package(checksum)
+        with mock.patch("WebHostLib.datapackage.max_cached_data_packages", 2):
+            first = get_data_package("evict 0")
+            second = get_data_package("evict 1")
+            self.assertIs(get_data_package("evict 0"), first)
+            get_data_package("evict 2")  # evicts "evict 1", which was used least recently
+            self.assertIs(get_data_package("evict 0"), first)
+            self.assertIsNot(get_data_package("evict 1"), second)
+
+    def test_name_lookup(self) -> None:
+        """Tests that unknown ids get a name without changing the shared tables"""
+        from WebHostLib.datapackage import NameLookup
+
+        table = {1: "One"}
+        lookup = NameLookup(lambda code: f"Unknown {code}", table, {-1: "Minus One"})
+        self.assertEqual(lookup[1], "One")
+        self.assertEqual(lookup[-1], "Minus One")
+        self.assertEqual(lookup[2], "Unknown 2")
+        self.assertEqual(table, {1: "One"})
+        self.assertNotIn(2, lookup)
+
+    def test_archipelago_names(self) -> None:
+        """Tests that room name lookups prefer Archipelago's names over a game's own for the same id"""
+        from WebHostLib.customserver import WebHostContext
+
+        ctx = WebHostContext.__new__(WebHostContext)
+        ctx.gamespackage = {
+            "Archipelago": {"item_name_to_id": {"Nothing": -1}, "location_name_to_id": {"Cheat Console": -1}},
+            "Game": {"item_name_to_id": {"Item": 1, "Clash": -1}, "location_name_to_id": {"Clash": -1}},
+        }
+        ctx.item_name_groups = {}
+        ctx.location_name_groups = {}
+        ctx.data_packages = {}
+        ctx.checksums = {}
+        ctx.all_item_and_group_names = {}
+        ctx.all_location_and_group_names = {}
+        ctx._init_game_data()
+        self.assertEqual(ctx.item_names["Game"][1], "Item")
+        self.assertEqual(ctx.item_names["Game"][-1], "Nothing")
+        self.assertEqual(ctx.location_names["Game"][-1], "Cheat Console")
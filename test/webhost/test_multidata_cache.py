@@ -0,0 +1,45 @@
+import os
+import tempfile
+import time
+from unittest import mock
+from uuid import uuid4
+
+from . import TestBase
+
+
+class TestMultidataCache(TestBase):
+    def setUp(self) -> None:
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        patcher = mock.patch("Utils.cache_path", lambda *path: os.path.join(temp_dir.name, *path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_clean(self) -> None:
+        """Tests that cached multidata of deleted and long unhosted seeds is deleted, and of hosted seeds kept"""
+        from pony.orm import db_session
+        from Utils import cache_path
+        from WebHostLib.customserver import clean_multidata_cache, get_seed_multidata, multidata_cache_max_age
+        from WebHostLib.models import Seed
+
+        with db_session:
+            hosted_seed = Seed(multidata=b"hosted", owner=uuid4())
+            unhosted_seed = Seed(multidata=b"unhosted", owner=uuid4())
+            deleted_seed = Seed(multidata=b"deleted", owner=uuid4())
+            for seed in (hosted_seed, unhosted_seed, deleted_seed):
+                multidata = get_seed_multidata(seed)
+                self.assertEqual(multidata[:], seed.multidata)
+                multidata.close()
+            deleted_seed.delete()
+
+        @self.addCleanup
+        @db_session
+        def delete_seeds() -> None:
+            Seed[hosted_seed.id].delete()
+            Seed[unhosted_seed.id].delete()
+
+        old = time.time() - multidata_cache_max_age.total_seconds() - 60
+        os.utime(cache_path("multidata", f"{unhosted_seed.id}.archipelago"), (old, old))
+        self.assertEqual(clean_multidata_cache(), 2)
+        self.assertEqual(os.listdir(cache_path("multidata")), [f"{hosted_seed.id}.archipelago"])
@@ -0,0 +1,35 @@
+import unittest
+from uuid import uuid4
+
+
+class TestRoomNotifications(unittest.TestCase):
+    def test_notify_room(self) -> None:
+        """Tests that room notifications arrive at the listener, with multiple notifications coalesced"""
+        from WebHostLib.notifications import RoomNotificationListener, notify_room
+
+        listener = RoomNotificationListener(0)  # any free port
+        try:
+            config = {"ROOM_NOTIFICATION_PORT": listener.socket.getsockname()[1]}
+            room_id, other_room_id = uuid4(), uuid4()
+            notify_room(config, room_id)
+            notify_room(config, room_id)
+            notify_room(config, other_room_id)
+            received = listener.receive(1)
+            while len(received) < 2:
+                new = listener.receive(1)
+                if not new:
+                    break
+                received |= new
+            self.assertEqual(received, {room_id, other_room_id})
+            self.assertEqual(listener.receive(0), set())
+        finally:
+            listener.close()
+
+    def test_disabled(self) -> None:
+        """Tests that notifications are off by default"""
+        from WebHostLib import app
+        from WebHostLib.notifications import RoomNotificationListener, notify_room
+
+        config = {"ROOM_NOTIFICATION_PORT": app.config["ROOM_NOTIFICATION_PORT"]}
+        self.assertIsNone(RoomNotificationListener.create(config))
+        notify_room(config, uuid4())
@@ -0,0 +1,41 @@
+import datetime
+import pickle
+from unittest import mock
+from uuid import uuid4
+
+from pony.orm import db_session
+
+from . import TestBase
+
+
+class TestTrackerCache(TestBase):
+    def test_decoded_across_requests(self) -> None:
+        """Tests that trackers only decode multidata once and multisave again after the room saved"""
+        from WebHostLib.models import Room, Seed
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            seed = Seed(multidata=b"", owner=uuid4())
+            room = Room(seed=seed, owner=uuid4(), tracker=uuid4(), multisave=pickle.dumps({"hints": {}}))
+            room_id = room.id
+
+        with mock.patch("WebHostLib.tracker.Context.decompress", return_value={"datapackage": {}}) as decompress, \
+                mock.patch.object(Room, "get_multisave", autospec=True, side_effect=lambda r: {}) as get_multisave:
+            with db_session:
+                first = TrackerData(Room.get(id=room_id))
+            with db_session:
+                second = TrackerData(Room.get(id=room_id))
+            self.assertIs(first._multidata, second._multidata)
+            self.assertIs(first._multisave, second._multisave)
+            self.assertEqual(decompress.call_count, 1)
+            self.assertEqual(get_multisave.call_count, 1)
+
+            with db_session:
+                # saving updates last_activity
+                Room.get(id=room_id).last_activity += datetime.timedelta(seconds=1)
+            with db_session:
+                third = TrackerData(Room.get(id=room_id))
+            self.assertIs(first._multidata, third._multidata)
+            self.assertIsNot(first._multisave, third._multisave)
+            self.assertEqual(decompress.call_count, 1)
+            self.assertEqual(get_multisave.call_count, 2)
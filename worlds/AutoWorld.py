@@ -173,11 +173,44 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
         return ret
 
 
+def _call_parallel(multiworld: "MultiWorld", method_name: str, players: List[int], *args: Any) -> None:
+    """Runs a stage for multiple players concurrently. Exceptions are raised in player order."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    prev_item_count = len(multiworld.itempool)
+    # worlds running concurrently may only use their own random, as the global one would depend on thread timing
+    passthrough = multiworld.random.passthrough
+    multiworld.random.passthrough = False
+    try:
+        with ThreadPoolExecutor(min(multiworld.parallel_stage_workers, len(players)),
+                                thread_name_prefix=method_name) as pool:
+            futures = [pool.submit(call_single, multiworld, method_name, player, *args) for player in players]
+            for future in futures:
+                future.result()
+    finally:
+        multiworld.random.passthrough = passthrough
+    assert len(multiworld.itempool) == prev_item_count, \
+        f"Items were added to the itempool in {method_name}, which was declared parallel safe."
+
+
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
+    sequential_players: List[int] = []
+    parallel_players: List[int] = []
     for player in multiworld.player_ids:
-        prev_item_count = len(multiworld.itempool)
         world_types.add(multiworld.worlds[player].__class__)
+        if multiworld.parallel_stage_workers > 1 and method_name in multiworld.worlds[player].parallel_safe_stages:
+            parallel_players.append(player)
+        else:
+            sequential_players.append(player)
+
+    if len(parallel_players) > 1:
+        _call_parallel(multiworld, method_name, parallel_players, *args)
+    else:
+        sequential_players = multiworld.player_ids
+
+    for player in sequential_players:
+        prev_item_count = len(multiworld.itempool)
         call_single(multiworld, method_name, player, *args)
         if __debug__:
             new_items = multiworld.itempool[prev_item_count:]
@@ -289,6 +322,22 @@ class World(metaclass=AutoWorldRegister):
     hidden: ClassVar[bool] = False
     """Hide World Type from various views. Does not remove functionality."""
 
+    parallel_safe_stages: ClassVar[FrozenSet[str]] = frozenset()
+    """
+    Names of per-player stages, such as "create_regions" or "set_rules", that only modify this world's own data.
+    If the generator is configured with parallel_stage_workers, these run concurrently with other worlds doing the same
+    stage. They may not use multiworld.random or add to the itempool, and may not depend on other worlds' results of
+    the same stage, so that a seed generates the same result either way.
+    """
+
+    output_process_safe: ClassVar[bool] = False
+    """
+    Whether generate_output only writes its output files, without changing anything that is read afterwards, such as
+    by fill_slot_data, modify_multidata or the spoiler. If the generator is configured with output_processes,
+    generate_output then runs in a forked copy of the generator process, so any change it makes is lost. Worlds whose
+    generate_output sets spoiler entrances or values later sent in their slot data must leave this False.
+    """
+
     web: ClassVar[WebWorld] = WebWorld()
     """see WebWorld for options"""
 
@@ -2,12 +2,13 @@ from __future__ import annotations
 
 import abc
 import json
+import struct
 import zipfile
 from enum import IntEnum
 import os
 import threading
 
-from typing import ClassVar, Dict, List, Literal, Tuple, Any, Optional, Union, BinaryIO, overload, Sequence
+from typing import ClassVar, Dict, List, Literal, Tuple, Any, Optional, Union, BinaryIO, overload, Sequence, Callable
 
 import bsdiff4
 
@@ -364,6 +365,47 @@ class APTokenMixin:
         self._tokens.append((token_type, offset, data))
 
 
+_token_header = struct.Struct("<BII")  # token type, offset and size of the arguments
+
+
+def _apply_tokens(rom_data: bytearray, token_data: bytes) -> None:
+    """Applies a token binary, as created by APTokenMixin.get_token_binary, onto rom_data in place."""
+    tokens = memoryview(token_data)
+    token_count = int.from_bytes(tokens[0:4], "little")
+    bpr = 4
+    for _ in range(token_count):
+        token_type, offset, size = _token_header.unpack_from(tokens, bpr)
+        bpr += 9
+        data = tokens[bpr:bpr + size]
+        bpr += size
+        if token_type == APTokenTypes.AND_8:
+            rom_data[offset] &= data[0]
+        elif token_type == APTokenTypes.OR_8:
+            rom_data[offset] |= data[0]
+        elif token_type == APTokenTypes.XOR_8:
+            rom_data[offset] ^= data[0]
+        elif token_type == APTokenTypes.COPY:
+            length = int.from_bytes(data[:4], "little")
+            value = int.from_bytes(data[4:], "little")
+            rom_data[offset: offset + length] = rom_data[value: value + length]
+        elif token_type == APTokenTypes.RLE:
+            length = int.from_bytes(data[:4], "little")
+            value = int.from_bytes(data[4:], "little")
+            rom_data[offset: offset + length] = bytes([value]) * length if length else b""
+        else:
+            rom_data[offset:offset + len(data)] = data
+
+
+def get_token_applier() -> Callable[[bytearray, bytes], None]:
+    """Returns the compiled _speedups.apply_tokens if available, or the pure python implementation."""
+    try:
+        import NetUtils  # noqa: F401  # compiles _speedups with pyximport, if it isn't built yet
+        from _speedups import apply_tokens
+    except ImportError:  # _speedups not available, or predates apply_tokens
+        return _apply_tokens
+    return apply_tokens
+
+
 class APPatchExtension(metaclass=AutoPatchExtensionRegister):
     """Class that defines patch extension functions for a given game.
     Patch extension functions must have the following two arguments in the following order:
@@ -387,33 +429,8 @@ class APPatchExtension(metaclass=AutoPatchExtensionRegister):
     @staticmethod
     def apply_tokens(caller: APProcedurePatch, rom: bytes, token_file: str) -> bytes:
         """Applies the given token file from the patch onto the current file."""
-        token_data = caller.get_file(token_file)
         rom_data = bytearray(rom)
-        token_count = int.from_bytes(token_data[0:4], "little")
-        bpr = 4
-        for _ in range(token_count):
-            token_type = token_data[bpr:bpr + 1][0]
-            offset = int.from_bytes(token_data[bpr + 1:bpr + 5], "little")
-            size = int.from_bytes(token_data[bpr + 5:bpr + 9], "little")
-            data = token_data[bpr + 9:bpr + 9 + size]
-            if token_type in [APTokenTypes.AND_8, APTokenTypes.OR_8, APTokenTypes.XOR_8]:
-                arg = data[0]
-                if token_type == APTokenTypes.AND_8:
-                    rom_data[offset] = rom_data[offset] & arg
-                elif token_type == APTokenTypes.OR_8:
-                    rom_data[offset] = rom_data[offset] | arg
-                else:
-                    rom_data[offset] = rom_data[offset] ^ arg
-            elif token_type in [APTokenTypes.COPY, APTokenTypes.RLE]:
-                length = int.from_bytes(data[:4], "little")
-                value = int.from_bytes(data[4:], "little")
-                if token_type == APTokenTypes.COPY:
-                    rom_data[offset: offset + length] = rom_data[value: value + length]
-                else:
-                    rom_data[offset: offset + length] = bytes([value] * length)
-            else:
-                rom_data[offset:offset + len(data)] = data
-            bpr += 9 + size
+        get_token_applier()(rom_data, caller.get_file(token_file))
         return bytes(rom_data)
 
     @staticmethod
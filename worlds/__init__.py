@@ -1,15 +1,22 @@
+import builtins
+import contextlib
 import importlib
 import importlib.util
+import json
 import logging
 import os
+import pickle
 import sys
+import sysconfig
+import types
 import warnings
 import zipimport
 import time
+import tracemalloc
 import dataclasses
-from typing import Dict, List, TypedDict
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypedDict
 
-from Utils import local_path, user_path
+from Utils import __version__, cache_path, local_path, restricted_loads, user_path
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -27,6 +34,8 @@ __all__ = {
     "GamesPackage",
     "DataPackage",
     "failed_world_loads",
+    "load_worlds",
+    "get_import_profile",
 }
 
 
@@ -45,12 +54,48 @@ class DataPackage(TypedDict):
     games: Dict[str, GamesPackage]
 
 
+_module_imports: Dict[str, Set[str]] = {}
+"""names of the modules imported by each module's import statements that ran while loading worlds,
+including modules that were already imported"""
+
+
+@contextlib.contextmanager
+def _record_imports() -> Iterator[None]:
+    """Records the modules import statements import into _module_imports while active."""
+    original_import = builtins.__import__
+
+    def recording_import(name: str, globals: Optional[Dict[str, Any]] = None, locals: Optional[Dict[str, Any]] = None,
+                         fromlist: Collection[str] = (), level: int = 0) -> types.ModuleType:
+        module = original_import(name, globals, locals, fromlist, level)
+        if globals and "__name__" in globals:
+            try:
+                resolved = importlib.util.resolve_name("." * level + name, globals.get("__package__")) \
+                    if level else name
+            except (ImportError, ValueError):
+                return module
+            imports = _module_imports.setdefault(globals["__name__"], set())
+            imports.add(resolved)
+            for attribute in fromlist or ():
+                if f"{resolved}.{attribute}" in sys.modules:
+                    imports.add(f"{resolved}.{attribute}")
+        return module
+
+    builtins.__import__ = recording_import
+    try:
+        yield
+    finally:
+        builtins.__import__ = original_import
+
+
 @dataclasses.dataclass(order=True)
 class WorldSource:
     path: str  # typically relative path from this module
     is_zip: bool = False
     relative: bool = True  # relative to regular world import folder
     time_taken: float = -1.0
+    loaded: bool = dataclasses.field(default=False, compare=False)  # load was attempted
+    modules_imported: int = dataclasses.field(default=-1, compare=False)
+    memory_peak: int = dataclasses.field(default=-1, compare=False)  # bytes above the start, only if tracemalloc runs
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.path}, is_zip={self.is_zip}, relative={self.relative})"
@@ -61,29 +106,48 @@ class WorldSource:
             return os.path.join(local_folder, self.path)
         return self.path
 
+    @property
+    def module_name(self) -> str:
+        return os.path.basename(self.path).rsplit(".", 1)[0]
+
     def load(self) -> bool:
+        self.loaded = True
         try:
-            start = time.perf_counter()
-            if self.is_zip:
-                importer = zipimport.zipimporter(self.resolved_path)
-                if hasattr(importer, "find_spec"):  # new in Python 3.10
-                    spec = importer.find_spec(os.path.basename(self.path).rsplit(".", 1)[0])
-                    assert spec, f"{self.path} is not a loadable module"
-                    mod = importlib.util.module_from_spec(spec)
+            modules_before = set(sys.modules)
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                if hasattr(tracemalloc, "reset_peak"):  # new in Python 3.9
+                    memory_before = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
                 else:  # TODO: remove with 3.8 support
-                    mod = importer.load_module(os.path.basename(self.path).rsplit(".", 1)[0])
-
-                mod.__package__ = f"worlds.{mod.__package__}"
-                mod.__name__ = f"worlds.{mod.__name__}"
-                sys.modules[mod.__name__] = mod
-                with warnings.catch_warnings():
-                    warnings.filterwarnings("ignore", message="__package__ != __spec__.parent")
-                    # Found no equivalent for < 3.10
-                    if hasattr(importer, "exec_module"):
-                        importer.exec_module(mod)
-            else:
-                importlib.import_module(f".{self.path}", "worlds")
+                    tracemalloc.stop()
+                    tracemalloc.start()
+                    memory_before = 0
+            start = time.perf_counter()
+            with _record_imports():
+                if self.is_zip:
+                    importer = zipimport.zipimporter(self.resolved_path)
+                    if hasattr(importer, "find_spec"):  # new in Python 3.10
+                        spec = importer.find_spec(os.path.basename(self.path).rsplit(".", 1)[0])
+                        assert spec, f"{self.path} is not a loadable module"
+                        mod = importlib.util.module_from_spec(spec)
+                    else:  # TODO: remove with 3.8 support
+                        mod = importer.load_module(os.path.basename(self.path).rsplit(".", 1)[0])
+
+                    mod.__package__ = f"worlds.{mod.__package__}"
+                    mod.__name__ = f"worlds.{mod.__name__}"
+                    sys.modules[mod.__name__] = mod
+                    with warnings.catch_warnings():
+                        warnings.filterwarnings("ignore", message="__package__ != __spec__.parent")
+                        # Found no equivalent for < 3.10
+                        if hasattr(importer, "exec_module"):
+                            importer.exec_module(mod)
+                else:
+                    importlib.import_module(f".{self.path}", "worlds")
             self.time_taken = time.perf_counter()-start
+            self.modules_imported = len(set(sys.modules) - modules_before)
+            if tracing:
+                self.memory_peak = tracemalloc.get_traced_memory()[1] - memory_before
             return True
 
         except Exception:
@@ -117,15 +181,282 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
-# import all submodules to trigger AutoWorldRegister
-world_sources.sort()
-for world_source in world_sources:
-    world_source.load()
+world_games_path = cache_path("world_games.json")
+"""Caches the games each world module provides, so a subset of worlds can be loaded by game."""
+
+
+def _read_world_games() -> Dict[str, List[str]]:
+    try:
+        with open(world_games_path, encoding="utf-8") as f:
+            world_games = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return world_games if isinstance(world_games, dict) else {}
+
+
+def _write_cache(path: str, data: bytes) -> None:
+    """Replaces a cache file with data, logging instead of raising if it can't be written."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # other processes may be loading worlds as well, so write to a unique file and swap that in
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.debug(f"Could not write cache {path}: {e}")
+
+
+def _write_world_games(world_games: Dict[str, List[str]]) -> None:
+    _write_cache(world_games_path, json.dumps(world_games).encode("utf-8"))
+
+
+data_package_cache_path = cache_path("datapackage", "worlds.pickle")
+"""Data packages of installed worlds, so other processes can skip sorting, serializing and hashing them."""
+data_package_cache_format = 3
+"""Increased when the cached entries change, so caches written by other versions of this module are rebuilt."""
+SourceFingerprint = Tuple[Tuple[str, int, int], ...]
+
+
+def _get_files_fingerprint(paths: Iterable[str]) -> Optional[SourceFingerprint]:
+    """Returns the path, modification time and size of each file, or None if one can't be read."""
+    files: List[Tuple[str, int, int]] = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        files.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(files)
+
+
+def _get_source_fingerprint(world_source: WorldSource) -> Optional[SourceFingerprint]:
+    """Returns the path, modification time and size of each file of a world source, or None if it can't be read."""
+    try:
+        if world_source.is_zip:
+            stat = os.stat(world_source.resolved_path)
+            return (("", stat.st_mtime_ns, stat.st_size),)
+        files: List[Tuple[str, int, int]] = []
+        folders = [world_source.resolved_path]
+        while folders:
+            with os.scandir(folders.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if entry.name != "__pycache__":
+                            folders.append(entry.path)
+                    else:
+                        stat = entry.stat()
+                        files.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        return tuple(files)
+    except OSError:
+        return None
+
+
+_stdlib_folder = os.path.join(sysconfig.get_paths()["stdlib"], "")
+_site_folders = tuple({os.path.join(sysconfig.get_paths()[key], "") for key in ("purelib", "platlib")})
+
+
+def _get_module_path(module: types.ModuleType) -> Optional[str]:
+    """Returns the file a module was loaded from, or the archive for modules imported from one."""
+    loader = getattr(module, "__loader__", None)
+    if isinstance(loader, zipimport.zipimporter):
+        return loader.archive
+    return getattr(module, "__file__", None)
+
+
+def _get_referenced_modules(name: str, module: types.ModuleType) -> Set[str]:
+    """Returns the names of the modules a module imported while worlds were loading, its parent package and the
+    modules of the modules, classes and functions in its namespace."""
+    referenced = set(_module_imports.get(name, ()))
+    parent = name.rpartition(".")[0]
+    if parent:
+        referenced.add(parent)
+    for value in list(vars(module).values()):
+        if isinstance(value, types.ModuleType):
+            # a package has its loaded submodules as attributes, which it doesn't depend on unless it imported them
+            if not value.__name__.startswith(f"{name}."):
+                referenced.add(value.__name__)
+        elif isinstance(value, (type, types.FunctionType)):
+            module_name = getattr(value, "__module__", None)
+            if isinstance(module_name, str):
+                referenced.add(module_name)
+    return referenced
+
+
+def _get_world_dependencies(world_source: WorldSource, references: Dict[str, Set[str]]) -> Tuple[str, ...]:
+    """Returns the files outside a world source of the non-stdlib modules its modules reference, following the
+    references of worlds and other modules outside site-packages. Installed packages are tracked by the file of
+    their top level package, which gets replaced when they are reinstalled.
+    references caches the modules referenced by each module between calls."""
+    package = f"worlds.{world_source.module_name}"
+    source_folder = os.path.join(world_source.resolved_path, "")
+    pending = [name for name in list(sys.modules) if name == package or name.startswith(f"{package}.")]
+    seen = set(pending)
+    files: Set[str] = set()
+    while pending:
+        name = pending.pop()
+        module = sys.modules.get(name)
+        path = _get_module_path(module) if module else None
+        if not path:
+            continue  # built in
+        if path.startswith(_site_folders):
+            top_level_module = sys.modules.get(name.split(".", 1)[0])
+            top_level_path = _get_module_path(top_level_module) if top_level_module else None
+            if top_level_path:
+                files.add(top_level_path)
+            continue
+        if path.startswith(_stdlib_folder):
+            continue
+        if path != world_source.resolved_path and not path.startswith(source_folder):
+            files.add(path)
+        if name not in references:
+            references[name] = _get_referenced_modules(name, module)
+        for referenced in references[name]:
+            if referenced not in seen:
+                seen.add(referenced)
+                pending.append(referenced)
+    return tuple(sorted(files))
+
+
+def _read_data_package_cache() -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(data_package_cache_path, "rb") as f:
+            cache = restricted_loads(f.read())
+    except Exception as e:  # missing or unreadable, either way it gets rebuilt
+        logging.debug(f"Could not read data package cache: {e}")
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != (__version__, data_package_cache_format):
+        return {}
+    return cache["games"]
+
+
+def _get_data_package_sizes(world: "AutoWorldRegister") -> Tuple[int, int, int, int]:
+    return (len(world.item_name_to_id), len(world.location_name_to_id),
+            len(world.item_name_groups), len(world.location_name_groups))
+
+
+def _build_data_packages(world_types: Dict[str, "AutoWorldRegister"]) -> None:
+    """Adds the data packages of world_types to network_data_package, reusing the checksums and sorted groups
+    cached by other processes for worlds whose files are unchanged."""
+    cache = _read_data_package_cache()
+    changed = False
+    # a module name may be in both world folders, their files can't tell which of them was imported
+    world_source_by_module: Dict[str, Optional[WorldSource]] = {}
+    for world_source in world_sources:
+        if world_source.loaded:
+            world_source_by_module[world_source.module_name] = \
+                None if world_source.module_name in world_source_by_module else world_source
+    fingerprints: Dict[str, Optional[SourceFingerprint]] = {}
+    dependencies: Dict[str, Tuple[str, ...]] = {}
+    references: Dict[str, Set[str]] = {}
+
+    for world_name, world in world_types.items():
+        module_path = world.__module__.split(".")
+        world_source = world_source_by_module.get(module_path[1]) \
+            if len(module_path) > 1 and module_path[0] == "worlds" else None
+        if world_source is None:
+            network_data_package["games"][world_name] = world.get_data_package_data()
+            continue
+        if world_source.resolved_path not in fingerprints:
+            fingerprints[world_source.resolved_path] = _get_source_fingerprint(world_source)
+        fingerprint = fingerprints[world_source.resolved_path]
+        if world_source.resolved_path not in dependencies:
+            dependencies[world_source.resolved_path] = _get_world_dependencies(world_source, references)
+        sizes = _get_data_package_sizes(world)
+        cached = cache.get(world_name)
+        # the files of modules the world depends on from elsewhere, such as shared modules or worlds it builds on,
+        # have to be unchanged. Which are found can depend on what other code imported, so fewer are fine as well.
+        if cached and fingerprint is not None and cached["source"] == world_source.resolved_path \
+                and cached["fingerprint"] == fingerprint and cached["sizes"] == sizes \
+                and set(dependencies[world_source.resolved_path]) <= {path for path, _, _ in cached["imports"]} \
+                and _get_files_fingerprint(path for path, _, _ in cached["imports"]) == cached["imports"]:
+            network_data_package["games"][world_name] = {
+                "item_name_groups": cached["item_name_groups"],
+                "item_name_to_id": world.item_name_to_id,
+                "location_name_groups": cached["location_name_groups"],
+                "location_name_to_id": world.location_name_to_id,
+                "checksum": cached["checksum"],
+            }
+            continue
+        game_package = world.get_data_package_data()
+        network_data_package["games"][world_name] = game_package
+        imports = _get_files_fingerprint(dependencies[world_source.resolved_path])
+        if fingerprint is not None and imports is not None:
+            cache[world_name] = {
+                "source": world_source.resolved_path,
+                "fingerprint": fingerprint,
+                "imports": imports,
+                "sizes": sizes,
+                "item_name_groups": game_package["item_name_groups"],
+                "location_name_groups": game_package["location_name_groups"],
+                "checksum": game_package["checksum"],
+            }
+            changed = True
+
+    if changed:
+        source_paths = {world_source.resolved_path for world_source in world_sources}
+        cache = {world_name: cached for world_name, cached in cache.items() if cached["source"] in source_paths}
+        _write_cache(data_package_cache_path, pickle.dumps(
+            {"version": (__version__, data_package_cache_format), "games": cache}, pickle.HIGHEST_PROTOCOL))
+
+
+def load_worlds(games: Optional[Collection[str]] = None) -> None:
+    """Loads the worlds providing games, or all worlds if games is None. Worlds that are already loaded are skipped.
+    Worlds of unknown games are loaded to learn their games, and if a game is not found, all worlds are loaded."""
+    world_games = _read_world_games()
+    if games is None:
+        wanted = None
+        sources = world_sources
+    else:
+        wanted = {"Archipelago", *games}
+        sources = [world_source for world_source in world_sources
+                   if world_source.module_name not in world_games
+                   or not wanted.isdisjoint(world_games[world_source.module_name])]
+    for world_source in sources:
+        if not world_source.loaded:
+            world_source.load()
+    if wanted is not None and not wanted <= AutoWorldRegister.world_types.keys():
+        for world_source in world_sources:
+            if not world_source.loaded:
+                world_source.load()
+
+    # Build the data package for each game.
+    _build_data_packages({world_name: world for world_name, world in AutoWorldRegister.world_types.items()
+                          if world_name not in network_data_package["games"]})
+
+    loaded_world_games: Dict[str, List[str]] = {world_source.module_name: [] for world_source in world_sources
+                                                if world_source.loaded}
+    for world_name, world in AutoWorldRegister.world_types.items():
+        module_path = world.__module__.split(".")
+        if len(module_path) > 1 and module_path[0] == "worlds" and module_path[1] in loaded_world_games:
+            loaded_world_games[module_path[1]].append(world_name)
+    module_names = {world_source.module_name for world_source in world_sources}
+    new_world_games = {module_name: games for module_name, games in {**world_games, **loaded_world_games}.items()
+                       if module_name in module_names}
+    if new_world_games != world_games:
+        _write_world_games(new_world_games)
+
+
+def get_import_profile() -> str:
+    """Returns a report of the loaded worlds' import time, memory peak and imported modules, slowest first.
+    Memory peaks are only recorded while tracemalloc is tracing."""
+    lines = [f"{'World':<32} {'Seconds':>8} {'Peak MB':>8} {'Modules':>8}"]
+    for world_source in sorted((world_source for world_source in world_sources if world_source.time_taken >= 0),
+                               key=lambda world_source: world_source.time_taken, reverse=True):
+        memory_peak = f"{world_source.memory_peak / 2 ** 20:.1f}" if world_source.memory_peak >= 0 else "-"
+        lines.append(f"{world_source.module_name:<32} {world_source.time_taken:>8.3f} {memory_peak:>8} "
+                     f"{world_source.modules_imported:>8}")
+    return "\n".join(lines)
+
 
-# Build the data package for each game.
 from .AutoWorld import AutoWorldRegister
 
 network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
+    "games": {},
 }
 
+# import submodules to trigger AutoWorldRegister, only those of the listed games if the importing process knows them
+world_sources.sort()
+_games = os.environ.pop("ARCHIPELAGO_GAMES", None)  # not inherited by processes this one starts, they get all worlds
+load_worlds(json.loads(_games) if _games else None)
+del _games
@@ -41,6 +41,7 @@ class CliqueWorld(World):
     option_definitions = clique_options
     location_name_to_id = location_table
     item_name_to_id = item_table
+    parallel_safe_stages = frozenset({"create_regions", "set_rules"})
 
     def create_item(self, name: str) -> CliqueItem:
         return CliqueItem(name, item_data_table[name].type, item_data_table[name].code, self.player)
@@ -113,6 +113,7 @@ class Factorio(World):
         self.tech_tree_layout_prerequisites = {}
 
     generate_output = generate_mod
+    output_process_safe = True  # the mod's random values are only used in the mod
 
     def generate_early(self) -> None:
         # if max < min, then swap max and min
@@ -60,7 +60,7 @@ def load_item_data():
             if door.item_group is not None:
                 ITEMS_BY_GROUP.setdefault(door.item_group, []).append(door.item_name)
 
-    for group in door_groups:
+    for group in sorted(door_groups):
         ALL_ITEM_TABLE[group] = ItemData(get_door_group_item_id(group),
                                          ItemClassification.progression, ItemType.NORMAL, True, [])
         ITEMS_BY_GROUP.setdefault("Doors", []).append(group)
@@ -75,7 +75,7 @@ def load_item_data():
                                                             ItemClassification.progression, ItemType.NORMAL, False, [])
             ITEMS_BY_GROUP.setdefault("Panels", []).append(panel_door.item_name)
 
-    for group in panel_groups:
+    for group in sorted(panel_groups):
         ALL_ITEM_TABLE[group] = ItemData(get_panel_group_item_id(group), ItemClassification.progression,
                                          ItemType.NORMAL, False, [])
         ITEMS_BY_GROUP.setdefault("Panels", []).append(group)
@@ -98,7 +98,7 @@ def load_item_data():
         elif classification == ItemClassification.trap:
             ITEMS_BY_GROUP.setdefault("Traps", []).append(item_name)
 
-    for item_name in PROGRESSIVE_ITEMS:
+    for item_name in sorted(PROGRESSIVE_ITEMS):
         ALL_ITEM_TABLE[item_name] = ItemData(get_progressive_item_id(item_name),
                                              ItemClassification.progression, ItemType.NORMAL, False, [])
 